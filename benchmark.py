@@ -0,0 +1,364 @@
+"""
+SysStock - Benchmark dos endpoints quentes
+
+Uso:
+    # 1) Cria o schema (APAGA as tabelas do DB_NAME) e as empresas sintéticas
+    python benchmark.py seed --recriar-schema --tamanhos 1000,100000,1000000
+
+    # 2) Com o app rodando (gunicorn -c gunicorn_conf.py), dispara os clientes
+    python benchmark.py run --url http://127.0.0.1:5000 --empresa bench_100k \\
+        --clientes 16 --duracao 60 --saida resultado.json
+
+O banco é o mesmo do app (DB_HOST/DB_USER/DB_PASSWORD/DB_NAME/DB_PORT via .env).
+A saída do "run" é JSON: vazão, percentis de latência e queries por request
+(lidas do header Server-Timing) para cada endpoint, para comparar entre deploys.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+import mysql.connector
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST'),
+    'user': os.getenv('DB_USER'),
+    'password': os.getenv('DB_PASSWORD'),
+    'database': os.getenv('DB_NAME'),
+    'port': int(os.getenv('DB_PORT', 3306)),
+    'autocommit': True,
+}
+
+BENCH_USUARIO = 'bench'
+BENCH_SENHA = 'bench123'
+SEED_BLOCO = 5000
+SEED_ALEATORIO = 42  # Mesma semente => mesmos produtos em toda execução
+
+PALAVRAS = (
+    'parafuso', 'porca', 'arruela', 'cabo', 'tomada', 'interruptor', 'lampada', 'fita',
+    'cola', 'tinta', 'pincel', 'rolo', 'lixa', 'broca', 'serra', 'martelo', 'alicate',
+    'chave', 'trena', 'nivel', 'mangueira', 'registro', 'torneira', 'joelho', 'luva',
+    'conector', 'disjuntor', 'fio', 'prego', 'bucha', 'dobradica', 'fechadura', 'cadeado',
+)
+ADJETIVOS = ('inox', 'galvanizado', 'branco', 'preto', 'azul', 'pequeno', 'medio', 'grande', 'reforcado', 'pvc')
+
+
+def nome_empresa(tamanho):
+    if tamanho % 1000000 == 0:
+        return f'bench_{tamanho // 1000000}m'
+    if tamanho % 1000 == 0:
+        return f'bench_{tamanho // 1000}k'
+    return f'bench_{tamanho}'
+
+
+def produto_sintetico(rnd, empresa_id, i):
+    descricao = f'{rnd.choice(PALAVRAS).upper()} {rnd.choice(ADJETIVOS).upper()} {rnd.randint(1, 999)}MM'
+    custo = round(rnd.uniform(0.5, 500), 2)
+    return (
+        empresa_id, f'P{i:07d}', f'789{i:010d}', descricao, 'UN',
+        rnd.randint(0, 500), custo, round(custo * rnd.uniform(1.2, 2.5), 2),
+    )
+
+
+# ==================== SEED ====================
+
+def aplicar_schema(conn):
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'setup_master.sql'), encoding='utf-8') as f:
+        script = f.read()
+    script = script.replace('`sysstock`', f"`{DB_CONFIG['database']}`")
+    cursor = conn.cursor()
+    for _ in cursor.execute(script, multi=True):
+        pass
+    cursor.close()
+    print(f"✅ Schema aplicado em {DB_CONFIG['database']}")
+
+
+def seed_empresa(conn, tamanho):
+    tag = nome_empresa(tamanho)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM empresas WHERE tag = %s", (tag,))
+    row = cursor.fetchone()
+    if row:
+        cursor.execute("SELECT COUNT(*) FROM produtos WHERE empresa_id = %s", (row[0],))
+        if cursor.fetchone()[0] == tamanho:
+            print(f"⏭️  {tag} já existe com {tamanho} produtos")
+            cursor.close()
+            return
+        cursor.execute("DELETE FROM empresas WHERE id = %s", (row[0],))
+
+    cursor.execute("INSERT INTO empresas (tag, descricao, ativo) VALUES (%s, %s, 'S')", (tag, f'Benchmark {tamanho}'))
+    empresa_id = cursor.lastrowid
+    cursor.execute("""
+        INSERT INTO usuarios (empresa_id, usuario, senha, nome, ativo, is_admin)
+        VALUES (%s, %s, SHA2(%s, 256), 'Benchmark', 1, 1)
+    """, (empresa_id, f'{BENCH_USUARIO}_{tag}', BENCH_SENHA))
+
+    rnd = random.Random(SEED_ALEATORIO)
+    query = """
+        INSERT INTO produtos (empresa_id, codigo, codigo_barras, descricao, unidade, quantidade, preco_custo, preco_venda)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    inicio = time.perf_counter()
+    for base in range(0, tamanho, SEED_BLOCO):
+        bloco = [produto_sintetico(rnd, empresa_id, i) for i in range(base, min(base + SEED_BLOCO, tamanho))]
+        conn.start_transaction()
+        cursor.executemany(query, bloco)
+        conn.commit()
+        print(f"   {tag}: {base + len(bloco)}/{tamanho}", end='\r')
+
+    cursor.execute("""
+        INSERT INTO estoque_resumo
+            (empresa_id, total_produtos, quantidade_total, valor_custo_total, valor_venda_total)
+        SELECT %s, COUNT(id), COALESCE(SUM(quantidade), 0),
+               COALESCE(SUM(quantidade * preco_custo), 0), COALESCE(SUM(quantidade * preco_venda), 0)
+        FROM produtos
+        WHERE empresa_id = %s AND ativo = 1
+        ON DUPLICATE KEY UPDATE
+            total_produtos = VALUES(total_produtos),
+            quantidade_total = VALUES(quantidade_total),
+            valor_custo_total = VALUES(valor_custo_total),
+            valor_venda_total = VALUES(valor_venda_total)
+    """, (empresa_id, empresa_id))
+    cursor.execute("ANALYZE TABLE produtos")
+    cursor.fetchall()
+    cursor.close()
+    print(f"✅ {tag}: {tamanho} produtos em {time.perf_counter() - inicio:.1f}s")
+
+
+def comando_seed(args):
+    conn = mysql.connector.connect(**DB_CONFIG)
+    if args.recriar_schema:
+        aplicar_schema(conn)
+    for tamanho in args.tamanhos:
+        seed_empresa(conn, tamanho)
+    conn.close()
+
+
+# ==================== CLIENTES ====================
+
+class ClienteHTTP:
+    """Um leitor simulado: conexão keep-alive própria e cookie de sessão próprio"""
+
+    def __init__(self, url, timeout):
+        partes = urlsplit(url)
+        classe = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        self._conn = classe(partes.hostname, partes.port, timeout=timeout)
+        self._cookies = SimpleCookie()
+
+    def requisitar(self, metodo, caminho, corpo=None, headers=None):
+        headers = dict(headers or {})
+        if self._cookies:
+            headers['Cookie'] = '; '.join(f'{k}={m.value}' for k, m in self._cookies.items())
+        inicio = time.perf_counter()
+        try:
+            self._conn.request(metodo, caminho, body=corpo, headers=headers)
+            resp = self._conn.getresponse()
+            dados = resp.read()
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            raise
+        ms = (time.perf_counter() - inicio) * 1000
+        for valor in resp.headers.get_all('Set-Cookie') or []:
+            self._cookies.load(valor)
+        return resp.status, dados, ms, consultas_server_timing(resp.headers.get('Server-Timing'))
+
+    def fechar(self):
+        self._conn.close()
+
+
+def consultas_server_timing(valor):
+    """Número de queries informado pelo app em Server-Timing (db;desc="N queries")"""
+    if not valor:
+        return None
+    achado = re.search(r'desc="(\d+) queries"', valor)
+    return int(achado.group(1)) if achado else None
+
+
+class Resultados:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def registrar(self, nome, ok, ms, consultas):
+        with self._lock:
+            dados = self.endpoints.setdefault(nome, {'latencias': [], 'erros': 0, 'consultas': []})
+            dados['latencias'].append(ms)
+            if not ok:
+                dados['erros'] += 1
+            if consultas is not None:
+                dados['consultas'].append(consultas)
+
+    def marcar_erro(self, nome):
+        with self._lock:
+            self.endpoints[nome]['erros'] += 1
+
+
+def medir(cliente, resultados, nome, metodo, caminho, corpo=None, headers=None):
+    try:
+        status, dados, ms, consultas = cliente.requisitar(metodo, caminho, corpo, headers)
+    except (OSError, http.client.HTTPException):
+        resultados.registrar(nome, False, 0.0, None)
+        return None
+    # Redirecionamento aqui é sessão perdida (volta para /login): conta como erro
+    ok = 200 <= status < 300
+    resultados.registrar(nome, ok, ms, consultas)
+    return dados if ok else None
+
+
+def entrar(cliente, resultados, args):
+    login = urlencode({'empresa': args.empresa, 'usuario': f'{BENCH_USUARIO}_{args.empresa}', 'senha': BENCH_SENHA})
+    dados = medir(cliente, resultados, 'POST /login', 'POST', '/login', login,
+                  {'Content-Type': 'application/x-www-form-urlencoded'})
+    try:
+        resposta = json.loads(dados) if dados else {}
+    except ValueError:
+        resposta = {}
+    if not resposta.get('success'):
+        if dados:
+            resultados.marcar_erro('POST /login')
+        print(f"❌ Login falhou em {args.empresa}: {resposta.get('message', 'sem resposta')}", file=sys.stderr)
+        return False
+    return True
+
+
+def simular_leitor(args, resultados, fim, semente):
+    rnd = random.Random(semente)
+    cliente = ClienteHTTP(args.url, args.timeout)
+    json_ct = {'Content-Type': 'application/json'}
+    if not entrar(cliente, resultados, args):
+        cliente.fechar()
+        return
+
+    versao = 0
+    while time.monotonic() < fim:
+        medir(cliente, resultados, 'GET /dashboard', 'GET', '/dashboard')
+        termo = rnd.choice(PALAVRAS)[:rnd.randint(3, 6)]
+        medir(cliente, resultados, 'GET /produtos?search=', 'GET', '/produtos?' + urlencode({'search': termo}))
+        for _ in range(args.leituras):
+            ean = f'789{rnd.randrange(args.produtos):010d}'
+            corpo = json.dumps({'identifier': ean, 'quantidade': 1})
+            medir(cliente, resultados, 'POST /api/contagem/add', 'POST', '/api/contagem/add', corpo, json_ct)
+        dados = medir(cliente, resultados, 'GET /api/contagem/list', 'GET', f'/api/contagem/list?since={versao}')
+        if dados:
+            versao = json.loads(dados).get('versao', versao)
+    cliente.fechar()
+
+
+def percentil(ordenados, q):
+    if not ordenados:
+        return None
+    return round(ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))], 2)
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def comando_run(args):
+    if args.produtos is None:
+        conn = mysql.connector.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) FROM produtos p JOIN empresas e ON e.id = p.empresa_id WHERE e.tag = %s
+        """, (args.empresa,))
+        args.produtos = cursor.fetchone()[0]
+        conn.close()
+    if not args.produtos:
+        sys.exit(f"❌ Empresa {args.empresa} sem produtos. Rode 'benchmark.py seed' antes.")
+
+    resultados = Resultados()
+    inicio = time.monotonic()
+    fim = inicio + args.duracao
+    threads = [
+        threading.Thread(target=simular_leitor, args=(args, resultados, fim, SEED_ALEATORIO + i), daemon=True)
+        for i in range(args.clientes)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Finaliza uma vez, com tudo que os leitores registraram
+    cliente = ClienteHTTP(args.url, args.timeout)
+    if entrar(cliente, resultados, args):
+        medir(cliente, resultados, 'POST /api/contagem/finalizar', 'POST', '/api/contagem/finalizar')
+    cliente.fechar()
+    duracao = time.monotonic() - inicio
+
+    relatorio = {
+        'commit': commit_atual(),
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'url': args.url,
+        'empresa': args.empresa,
+        'produtos': args.produtos,
+        'clientes': args.clientes,
+        'duracao_s': round(duracao, 2),
+        'endpoints': {},
+    }
+    total = 0
+    for nome, dados in sorted(resultados.endpoints.items()):
+        latencias = sorted(dados['latencias'])
+        total += len(latencias)
+        relatorio['endpoints'][nome] = {
+            'requests': len(latencias),
+            'erros': dados['erros'],
+            'rps': round(len(latencias) / duracao, 2),
+            'p50_ms': percentil(latencias, 0.50),
+            'p95_ms': percentil(latencias, 0.95),
+            'p99_ms': percentil(latencias, 0.99),
+            'max_ms': round(latencias[-1], 2) if latencias else None,
+            'queries_por_request': round(sum(dados['consultas']) / len(dados['consultas']), 2) if dados['consultas'] else None,
+        }
+    relatorio['rps_total'] = round(total / duracao, 2)
+
+    saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(saida + '\n')
+        print(f"✅ Resultado gravado em {args.saida}")
+    else:
+        print(saida)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos endpoints quentes do SysStock')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    seed = sub.add_parser('seed', help='Cria empresas sintéticas com N produtos cada')
+    seed.add_argument('--recriar-schema', action='store_true', help='Aplica setup_master.sql (apaga os dados)')
+    seed.add_argument('--tamanhos', default='1000,100000,1000000',
+                      type=lambda v: [int(t) for t in v.split(',') if t.strip()])
+    seed.set_defaults(func=comando_seed)
+
+    run = sub.add_parser('run', help='Dispara leitores simulados contra um app rodando')
+    run.add_argument('--url', default='http://127.0.0.1:5000')
+    run.add_argument('--empresa', default=nome_empresa(100000), help='Tag criada pelo seed (ex: bench_1k)')
+    run.add_argument('--clientes', type=int, default=8, help='Leitores simultâneos')
+    run.add_argument('--duracao', type=float, default=30, help='Segundos de carga')
+    run.add_argument('--leituras', type=int, default=10, help='Leituras por ciclo de cada leitor')
+    run.add_argument('--produtos', type=int, default=None, help='Faixa de EANs lidos (padrão: conta no banco)')
+    run.add_argument('--timeout', type=float, default=30)
+    run.add_argument('--saida', help='Arquivo JSON de saída (padrão: stdout)')
+    run.set_defaults(func=comando_run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,31 @@
 # Configuração otimizada do Gunicorn para Render
+import gc
 import multiprocessing
 import os
+import subprocess
+import sys
 
 # Bind
 bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
 
+# Perfil: 'sync' (padrão) ou 'gevent' (I/O cooperativo; o app ajusta o driver
+# MySQL e o pool sozinho). Ex.: GUNICORN_PROFILE=gevent gunicorn -c gunicorn_conf.py
+perfil = os.getenv('GUNICORN_PROFILE', 'sync').lower()
+
+# App: preparar_app() devolve o `app` do módulo com templates e manifesto dos
+# assets já carregados no mestre; o que é por processo nasce depois do fork
+wsgi_app = 'app:preparar_app()'
+
 # Workers
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = 'sync'  # ou 'gevent' para melhor performance
-worker_connections = 1000
+if perfil == 'gevent':
+    # Poucos processos, cada um atendendo centenas de scanners enquanto espera o MySQL
+    workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+    worker_class = 'gevent'
+    worker_connections = int(os.getenv('WORKER_CONNECTIONS', 1000))
+else:
+    workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+    worker_class = 'sync'
+    worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 100
 
@@ -23,8 +40,40 @@ errorlog = '-'
 loglevel = 'info'
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
 
-# Restart workers periodically
-preload_app = False
+# Preload: o mestre importa Flask, o driver MySQL e o app uma vez e cada worker
+# (inclusive os reciclados por max_requests) nasce de um fork, já pronto. O pool
+# de conexões é criado depois do fork, no primeiro uso de cada worker. Sob
+# gevent fica desligado: o monkey patch precisa vir antes do import do app.
+preload_app = os.getenv('GUNICORN_PRELOAD', '0' if perfil == 'gevent' else '1') == '1'
+
+# Migrações: com MIGRAR_NO_INICIO=1 o master aplica migrations/ antes de subir
+# os workers. Roda em outro processo para não importar o app no master.
+def on_starting(server):
+    if os.getenv('MIGRAR_NO_INICIO') == '1':
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'migrar'],
+                       cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+
+# Tarefas em segundo plano: com TAREFAS_NO_GUNICORN=1 o master sobe `flask tarefas`
+# ao lado dos workers e o encerra junto. Também pode rodar como serviço à parte.
+executores_tarefas = None
+
+def when_ready(server):
+    global executores_tarefas
+    if preload_app:
+        # Objetos do app vão para a geração permanente: o GC dos workers não os
+        # percorre e as páginas de memória continuam compartilhadas após o fork
+        gc.freeze()
+    if os.getenv('TAREFAS_NO_GUNICORN') == '1':
+        executores_tarefas = subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'app', 'tarefas'],
+                                              cwd=os.path.dirname(os.path.abspath(__file__)))
+
+def on_exit(server):
+    if executores_tarefas is not None and executores_tarefas.poll() is None:
+        executores_tarefas.terminate()
+        try:
+            executores_tarefas.wait(timeout=graceful_timeout)
+        except subprocess.TimeoutExpired:
+            executores_tarefas.kill()
 
 # Security
 limit_request_line = 4094
@@ -33,5 +82,7 @@ limit_request_field_size = 8190
 
 print(f"🚀 Gunicorn configurado:")
 print(f"   - Porta: {bind}")
+print(f"   - Perfil: {worker_class}")
 print(f"   - Workers: {workers}")
+print(f"   - Preload: {'sim' if preload_app else 'não'}")
 print(f"   - Timeout: {timeout}s")
\ No newline at end of file
@@ -0,0 +1,18 @@
+-- Índices de produtos com empresa_id à frente: leitura de EAN, listagem
+-- paginada por (descricao, id) e "menor estoque" do dashboard.
+-- Os índices antigos só são removidos depois que os novos existem.
+
+ALTER TABLE `produtos`
+  ADD COLUMN `versao` INT NOT NULL DEFAULT 0 COMMENT 'Incrementada a cada alteração (controle otimista)',
+  ALGORITHM=INSTANT;
+
+ALTER TABLE `produtos`
+  ADD KEY `idx_empresa_barras` (`empresa_id`, `codigo_barras`) COMMENT 'Leitura de EAN por empresa',
+  ADD KEY `idx_empresa_descricao` (`empresa_id`, `ativo`, `descricao`, `id`) COMMENT 'Listagem paginada por (descricao, id)',
+  ADD KEY `idx_empresa_estoque` (`empresa_id`, `ativo`, `quantidade`) COMMENT 'Produtos com menor estoque (dashboard)',
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE `produtos`
+  DROP KEY `idx_barras`,
+  DROP KEY `idx_descricao`,
+  ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,7 @@
+-- Busca por prefixo de palavra (MATCH ... AGAINST em modo booleano).
+-- O primeiro FULLTEXT da tabela recria o índice auxiliar do InnoDB e
+-- bloqueia escritas em produtos enquanto é construído: rodar fora do pico.
+
+ALTER TABLE `produtos`
+  ADD FULLTEXT KEY `ft_produtos` (`descricao`, `codigo`, `codigo_barras`) COMMENT 'Busca por prefixo de palavra',
+  ALGORITHM=INPLACE, LOCK=SHARED;
@@ -0,0 +1,18 @@
+-- Saldo após cada movimentação e índices do histórico paginado por
+-- (data_hora, id), com filtros de produto e tipo sempre dentro da empresa.
+-- idx_empresa só pode sair depois que outro índice cobre a FK fk_mov_empresa.
+
+ALTER TABLE `movimentacoes`
+  ADD COLUMN `saldo` DECIMAL(10,3) DEFAULT NULL COMMENT 'Quantidade do produto após a movimentação',
+  ALGORITHM=INSTANT;
+
+ALTER TABLE `movimentacoes`
+  ADD KEY `idx_empresa_data` (`empresa_id`, `data_hora`, `id`) COMMENT 'Histórico paginado por (data_hora, id)',
+  ADD KEY `idx_empresa_produto_data` (`empresa_id`, `produto_id`, `data_hora`, `id`),
+  ADD KEY `idx_empresa_tipo_data` (`empresa_id`, `tipo`, `data_hora`, `id`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE `movimentacoes`
+  DROP KEY `idx_empresa`,
+  DROP KEY `idx_data`,
+  ALGORITHM=INPLACE, LOCK=NONE;
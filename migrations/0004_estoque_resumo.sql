@@ -0,0 +1,37 @@
+-- Totais de estoque por empresa mantidos pela aplicação; a view passa a
+-- ler o resumo em vez de agregar produtos a cada consulta.
+
+CREATE TABLE IF NOT EXISTS `estoque_resumo` (
+  `empresa_id` INT NOT NULL,
+  `total_produtos` INT NOT NULL DEFAULT 0,
+  `quantidade_total` DECIMAL(20,3) NOT NULL DEFAULT 0.000,
+  `valor_custo_total` DECIMAL(24,5) NOT NULL DEFAULT 0.00000,
+  `valor_venda_total` DECIMAL(24,5) NOT NULL DEFAULT 0.00000,
+  `data_atualizacao` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`empresa_id`),
+  CONSTRAINT `fk_resumo_empresa` 
+    FOREIGN KEY (`empresa_id`) 
+    REFERENCES `empresas` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT INTO `estoque_resumo` (`empresa_id`, `total_produtos`, `quantidade_total`, `valor_custo_total`, `valor_venda_total`)
+SELECT empresa_id, COUNT(id), SUM(quantidade), SUM(quantidade * preco_custo), SUM(quantidade * preco_venda)
+FROM produtos
+WHERE ativo = 1
+GROUP BY empresa_id
+ON DUPLICATE KEY UPDATE
+  total_produtos = VALUES(total_produtos),
+  quantidade_total = VALUES(quantidade_total),
+  valor_custo_total = VALUES(valor_custo_total),
+  valor_venda_total = VALUES(valor_venda_total);
+
+CREATE OR REPLACE VIEW `vw_valor_estoque` AS
+SELECT 
+  r.empresa_id,
+  r.total_produtos,
+  r.quantidade_total,
+  r.valor_custo_total,
+  r.valor_venda_total,
+  r.valor_venda_total - r.valor_custo_total AS lucro_potencial
+FROM estoque_resumo r;
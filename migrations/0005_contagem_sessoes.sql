@@ -0,0 +1,87 @@
+-- Contagens simultâneas por zona. Os itens antigos (várias linhas por
+-- produto) viram uma sessão "Contagem anterior" por empresa, somados por
+-- produto, já na nova chave (sessao_id, produto_id).
+
+CREATE TABLE IF NOT EXISTS `contagem_sessoes` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `empresa_id` INT NOT NULL,
+  `usuario_id` INT DEFAULT NULL COMMENT 'Responsável pela sessão',
+  `zona` VARCHAR(100) NOT NULL DEFAULT '' COMMENT 'Corredor/setor contado',
+  `status` ENUM('ABERTA','FINALIZADA','CANCELADA') NOT NULL DEFAULT 'ABERTA',
+  `versao` BIGINT NOT NULL DEFAULT 0 COMMENT 'Incrementada a cada alteração dos itens da sessão',
+  `versao_limpeza` BIGINT NOT NULL DEFAULT 0 COMMENT 'Versão do último zerar',
+  `total_itens` INT NOT NULL DEFAULT 0 COMMENT 'Produtos aplicados ao finalizar',
+  `finalizada_por` INT DEFAULT NULL,
+  `data_abertura` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `data_finalizacao` TIMESTAMP NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_empresa_status` (`empresa_id`, `status`, `id`),
+  CONSTRAINT `fk_sessao_empresa` 
+    FOREIGN KEY (`empresa_id`) 
+    REFERENCES `empresas` (`id`) 
+    ON DELETE CASCADE,
+  CONSTRAINT `fk_sessao_user` 
+    FOREIGN KEY (`usuario_id`) 
+    REFERENCES `usuarios` (`id`) 
+    ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT INTO `contagem_sessoes` (`empresa_id`, `zona`, `versao`)
+SELECT empresa_id, 'Contagem anterior', 1
+FROM contagem_itens
+GROUP BY empresa_id;
+
+ALTER TABLE `contagem_itens`
+  DROP FOREIGN KEY `fk_cont_empresa`,
+  DROP FOREIGN KEY `fk_cont_prod`;
+
+RENAME TABLE `contagem_itens` TO `contagem_itens_antiga`;
+
+CREATE TABLE `contagem_itens` (
+  `sessao_id` INT NOT NULL,
+  `empresa_id` INT NOT NULL,
+  `produto_id` INT NOT NULL,
+  `quantidade` DECIMAL(10,3) NOT NULL,
+  `versao` BIGINT NOT NULL DEFAULT 0 COMMENT 'Versão da última alteração (contagem_sessoes.versao)',
+  `data_registro` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `data_atualizacao` TIMESTAMP(3) DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3) COMMENT 'Regra ULTIMA na mesclagem',
+  PRIMARY KEY (`sessao_id`, `produto_id`) COMMENT 'Agrupa fisicamente os itens de cada sessão; permite upsert atômico',
+  KEY `idx_sessao_versao` (`sessao_id`, `versao`),
+  KEY `idx_empresa_produto` (`empresa_id`, `produto_id`),
+  KEY `idx_produto` (`produto_id`),
+  CONSTRAINT `fk_cont_sessao` 
+    FOREIGN KEY (`sessao_id`) 
+    REFERENCES `contagem_sessoes` (`id`) 
+    ON DELETE CASCADE,
+  CONSTRAINT `fk_cont_empresa` 
+    FOREIGN KEY (`empresa_id`) 
+    REFERENCES `empresas` (`id`) 
+    ON DELETE CASCADE,
+  CONSTRAINT `fk_cont_prod` 
+    FOREIGN KEY (`produto_id`) 
+    REFERENCES `produtos` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `contagem_lotes` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `sessao_id` INT NOT NULL,
+  `lote_id` VARCHAR(64) NOT NULL COMMENT 'Gerado pelo cliente; reenvios do mesmo lote são ignorados',
+  `total_leituras` INT NOT NULL DEFAULT 0,
+  `data_registro` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_sessao_lote` (`sessao_id`, `lote_id`),
+  CONSTRAINT `fk_lote_sessao` 
+    FOREIGN KEY (`sessao_id`) 
+    REFERENCES `contagem_sessoes` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT INTO `contagem_itens` (`sessao_id`, `empresa_id`, `produto_id`, `quantidade`, `versao`, `data_registro`)
+SELECT s.id, a.empresa_id, a.produto_id, SUM(a.quantidade), 1, MIN(a.data_registro)
+FROM contagem_itens_antiga a
+JOIN contagem_sessoes s ON s.empresa_id = a.empresa_id AND s.zona = 'Contagem anterior' AND s.status = 'ABERTA'
+JOIN produtos p ON p.id = a.produto_id
+GROUP BY s.id, a.empresa_id, a.produto_id;
+
+DROP TABLE `contagem_itens_antiga`;
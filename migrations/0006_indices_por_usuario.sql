@@ -0,0 +1,15 @@
+-- Filtro do histórico por usuário (paginado por data_hora, id) e lista de
+-- usuários da empresa ordenada por nome, sem filesort. idx_empresa fica
+-- redundante: idx_empresa_nome começa pela mesma coluna e cobre a FK.
+
+ALTER TABLE `movimentacoes`
+  ADD KEY `idx_empresa_usuario_data` (`empresa_id`, `usuario_id`, `data_hora`, `id`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE `usuarios`
+  ADD KEY `idx_empresa_nome` (`empresa_id`, `nome`) COMMENT 'Usuários da empresa ordenados por nome',
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE `usuarios`
+  DROP KEY `idx_empresa`,
+  ALGORITHM=INPLACE, LOCK=NONE;
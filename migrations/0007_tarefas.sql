@@ -0,0 +1,33 @@
+-- Fila persistente das tarefas em segundo plano (flask tarefas).
+
+CREATE TABLE IF NOT EXISTS `tarefas` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT,
+  `empresa_id` INT NOT NULL,
+  `usuario_id` INT DEFAULT NULL,
+  `tipo` VARCHAR(50) NOT NULL,
+  `parametros` MEDIUMTEXT NOT NULL COMMENT 'JSON',
+  `status` ENUM('PENDENTE','EXECUTANDO','CONCLUIDA','FALHOU','CANCELADA') NOT NULL DEFAULT 'PENDENTE',
+  `tentativas` INT NOT NULL DEFAULT 0,
+  `max_tentativas` INT NOT NULL DEFAULT 3,
+  `processados` INT NOT NULL DEFAULT 0,
+  `total` INT DEFAULT NULL,
+  `resultado` MEDIUMTEXT DEFAULT NULL COMMENT 'JSON',
+  `erro` TEXT DEFAULT NULL,
+  `executor` VARCHAR(100) DEFAULT NULL COMMENT 'host:pid que está executando',
+  `heartbeat` TIMESTAMP(3) NULL DEFAULT NULL,
+  `disponivel_em` TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) COMMENT 'Nova tentativa só a partir daqui',
+  `data_criacao` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `data_inicio` TIMESTAMP NULL DEFAULT NULL,
+  `data_fim` TIMESTAMP NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_fila` (`status`, `disponivel_em`, `id`),
+  KEY `idx_empresa_status` (`empresa_id`, `status`, `id`),
+  CONSTRAINT `fk_tarefa_empresa` 
+    FOREIGN KEY (`empresa_id`) 
+    REFERENCES `empresas` (`id`) 
+    ON DELETE CASCADE,
+  CONSTRAINT `fk_tarefa_user` 
+    FOREIGN KEY (`usuario_id`) 
+    REFERENCES `usuarios` (`id`) 
+    ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
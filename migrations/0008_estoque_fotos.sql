@@ -0,0 +1,33 @@
+-- Fotos periódicas do estoque por empresa: saldo e preços de cada produto
+-- ativo num instante, mais os totais já somados. A posição numa data sai da
+-- foto anterior mais próxima e dos saldos das movimentações depois dela.
+
+CREATE TABLE IF NOT EXISTS `estoque_fotos` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `empresa_id` INT NOT NULL,
+  `data_referencia` TIMESTAMP NOT NULL COMMENT 'Instante da leitura de produtos',
+  `total_produtos` INT NOT NULL DEFAULT 0,
+  `quantidade_total` DECIMAL(20,3) NOT NULL DEFAULT 0.000,
+  `valor_custo_total` DECIMAL(24,5) NOT NULL DEFAULT 0.00000,
+  `valor_venda_total` DECIMAL(24,5) NOT NULL DEFAULT 0.00000,
+  `data_criacao` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_empresa_data` (`empresa_id`, `data_referencia`),
+  CONSTRAINT `fk_foto_empresa` 
+    FOREIGN KEY (`empresa_id`) 
+    REFERENCES `empresas` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `estoque_fotos_itens` (
+  `foto_id` INT NOT NULL,
+  `produto_id` INT NOT NULL,
+  `quantidade` DECIMAL(10,3) NOT NULL,
+  `preco_custo` DECIMAL(10,2) NOT NULL,
+  `preco_venda` DECIMAL(10,2) NOT NULL,
+  PRIMARY KEY (`foto_id`, `produto_id`),
+  CONSTRAINT `fk_foto_item_foto` 
+    FOREIGN KEY (`foto_id`) 
+    REFERENCES `estoque_fotos` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
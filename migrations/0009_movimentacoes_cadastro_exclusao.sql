@@ -0,0 +1,7 @@
+-- Cadastro e exclusão de produto passam a ficar no histórico: CADASTRO traz a
+-- quantidade inicial (também na reativação pela importação) e EXCLUSAO zera o
+-- saldo ativo. Sem elas a posição numa data a partir da foto não via produto
+-- criado com quantidade 0 nem produto excluído depois da foto.
+
+ALTER TABLE `movimentacoes`
+  MODIFY `tipo` ENUM('ENTRADA','SAIDA','AJUSTE','CONTAGEM','CADASTRO','EXCLUSAO') NOT NULL;
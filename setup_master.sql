@@ -30,7 +30,7 @@ CREATE TABLE `usuarios` (
   `id` INT NOT NULL AUTO_INCREMENT,
   `empresa_id` INT DEFAULT NULL COMMENT 'NULL = Master, INT = Empresa',
   `usuario` VARCHAR(50) NOT NULL,
-  `senha` VARCHAR(255) NOT NULL COMMENT 'SHA256',
+  `senha` VARCHAR(255) NOT NULL COMMENT 'scrypt$n$r$p$sal$hash (legado: SHA256 hex, migrado no login)',
   `nome` VARCHAR(100) NOT NULL,
   `ativo` TINYINT(1) DEFAULT 1,
   `is_master` TINYINT(1) DEFAULT 0 COMMENT 'Acesso total ao sistema',
@@ -38,7 +38,7 @@ CREATE TABLE `usuarios` (
   `data_cadastro` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
   UNIQUE KEY `uk_usuario` (`usuario`),
-  KEY `idx_empresa` (`empresa_id`),
+  KEY `idx_empresa_nome` (`empresa_id`, `nome`) COMMENT 'Usuários da empresa ordenados por nome',
   CONSTRAINT `fk_user_empresa` 
     FOREIGN KEY (`empresa_id`) 
     REFERENCES `empresas` (`id`) 
@@ -60,11 +60,14 @@ CREATE TABLE `produtos` (
   `preco_custo` DECIMAL(10,2) DEFAULT 0.00,
   `preco_venda` DECIMAL(10,2) DEFAULT 0.00,
   `ativo` TINYINT(1) DEFAULT 1,
+  `versao` INT NOT NULL DEFAULT 0 COMMENT 'Incrementada a cada alteração (controle otimista)',
   `data_cadastro` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
   UNIQUE KEY `uk_empresa_codigo` (`empresa_id`, `codigo`),
-  KEY `idx_barras` (`codigo_barras`),
-  KEY `idx_descricao` (`descricao`),
+  KEY `idx_empresa_barras` (`empresa_id`, `codigo_barras`) COMMENT 'Leitura de EAN por empresa',
+  KEY `idx_empresa_descricao` (`empresa_id`, `ativo`, `descricao`, `id`) COMMENT 'Listagem paginada por (descricao, id)',
+  FULLTEXT KEY `ft_produtos` (`descricao`, `codigo`, `codigo_barras`) COMMENT 'Busca por prefixo de palavra',
+  KEY `idx_empresa_estoque` (`empresa_id`, `ativo`, `quantidade`) COMMENT 'Produtos com menor estoque (dashboard)',
   CONSTRAINT `fk_prod_empresa` 
     FOREIGN KEY (`empresa_id`) 
     REFERENCES `empresas` (`id`) 
@@ -79,14 +82,17 @@ CREATE TABLE `movimentacoes` (
   `id` INT NOT NULL AUTO_INCREMENT,
   `empresa_id` INT NOT NULL,
   `produto_id` INT NOT NULL,
-  `tipo` ENUM('ENTRADA','SAIDA','AJUSTE','CONTAGEM') NOT NULL,
-  `quantidade` DECIMAL(10,3) NOT NULL,
+  `tipo` ENUM('ENTRADA','SAIDA','AJUSTE','CONTAGEM','CADASTRO','EXCLUSAO') NOT NULL,
+  `quantidade` DECIMAL(10,3) NOT NULL COMMENT 'ENTRADA/SAIDA: positiva; AJUSTE/CADASTRO/EXCLUSAO: diferença com sinal; CONTAGEM: valor contado',
+  `saldo` DECIMAL(10,3) DEFAULT NULL COMMENT 'Quantidade do produto após a movimentação',
   `usuario_id` INT DEFAULT NULL,
   `data_hora` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
-  KEY `idx_empresa` (`empresa_id`),
+  KEY `idx_empresa_data` (`empresa_id`, `data_hora`, `id`) COMMENT 'Histórico paginado por (data_hora, id)',
+  KEY `idx_empresa_produto_data` (`empresa_id`, `produto_id`, `data_hora`, `id`),
+  KEY `idx_empresa_tipo_data` (`empresa_id`, `tipo`, `data_hora`, `id`),
+  KEY `idx_empresa_usuario_data` (`empresa_id`, `usuario_id`, `data_hora`, `id`),
   KEY `idx_produto` (`produto_id`),
-  KEY `idx_data` (`data_hora`),
   CONSTRAINT `fk_mov_empresa` 
     FOREIGN KEY (`empresa_id`) 
     REFERENCES `empresas` (`id`) 
@@ -101,19 +107,54 @@ CREATE TABLE `movimentacoes` (
     ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- ==========================================
+-- TABELA: contagem_sessoes (contagens simultâneas por zona)
+-- ==========================================
+DROP TABLE IF EXISTS `contagem_sessoes`;
+CREATE TABLE `contagem_sessoes` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `empresa_id` INT NOT NULL,
+  `usuario_id` INT DEFAULT NULL COMMENT 'Responsável pela sessão',
+  `zona` VARCHAR(100) NOT NULL DEFAULT '' COMMENT 'Corredor/setor contado',
+  `status` ENUM('ABERTA','FINALIZADA','CANCELADA') NOT NULL DEFAULT 'ABERTA',
+  `versao` BIGINT NOT NULL DEFAULT 0 COMMENT 'Incrementada a cada alteração dos itens da sessão',
+  `versao_limpeza` BIGINT NOT NULL DEFAULT 0 COMMENT 'Versão do último zerar',
+  `total_itens` INT NOT NULL DEFAULT 0 COMMENT 'Produtos aplicados ao finalizar',
+  `finalizada_por` INT DEFAULT NULL,
+  `data_abertura` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `data_finalizacao` TIMESTAMP NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_empresa_status` (`empresa_id`, `status`, `id`),
+  CONSTRAINT `fk_sessao_empresa` 
+    FOREIGN KEY (`empresa_id`) 
+    REFERENCES `empresas` (`id`) 
+    ON DELETE CASCADE,
+  CONSTRAINT `fk_sessao_user` 
+    FOREIGN KEY (`usuario_id`) 
+    REFERENCES `usuarios` (`id`) 
+    ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- ==========================================
 -- TABELA: contagem_itens
 -- ==========================================
 DROP TABLE IF EXISTS `contagem_itens`;
 CREATE TABLE `contagem_itens` (
-  `id` INT NOT NULL AUTO_INCREMENT,
+  `sessao_id` INT NOT NULL,
   `empresa_id` INT NOT NULL,
   `produto_id` INT NOT NULL,
   `quantidade` DECIMAL(10,3) NOT NULL,
+  `versao` BIGINT NOT NULL DEFAULT 0 COMMENT 'Versão da última alteração (contagem_sessoes.versao)',
   `data_registro` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  PRIMARY KEY (`id`),
-  KEY `idx_empresa` (`empresa_id`),
+  `data_atualizacao` TIMESTAMP(3) DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3) COMMENT 'Regra ULTIMA na mesclagem',
+  PRIMARY KEY (`sessao_id`, `produto_id`) COMMENT 'Agrupa fisicamente os itens de cada sessão; permite upsert atômico',
+  KEY `idx_sessao_versao` (`sessao_id`, `versao`),
+  KEY `idx_empresa_produto` (`empresa_id`, `produto_id`),
   KEY `idx_produto` (`produto_id`),
+  CONSTRAINT `fk_cont_sessao` 
+    FOREIGN KEY (`sessao_id`) 
+    REFERENCES `contagem_sessoes` (`id`) 
+    ON DELETE CASCADE,
   CONSTRAINT `fk_cont_empresa` 
     FOREIGN KEY (`empresa_id`) 
     REFERENCES `empresas` (`id`) 
@@ -124,21 +165,142 @@ CREATE TABLE `contagem_itens` (
     ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- ==========================================
+-- TABELA: contagem_lotes (idempotência dos lotes do scanner)
+-- ==========================================
+DROP TABLE IF EXISTS `contagem_lotes`;
+CREATE TABLE `contagem_lotes` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `sessao_id` INT NOT NULL,
+  `lote_id` VARCHAR(64) NOT NULL COMMENT 'Gerado pelo cliente; reenvios do mesmo lote são ignorados',
+  `total_leituras` INT NOT NULL DEFAULT 0,
+  `data_registro` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_sessao_lote` (`sessao_id`, `lote_id`),
+  CONSTRAINT `fk_lote_sessao` 
+    FOREIGN KEY (`sessao_id`) 
+    REFERENCES `contagem_sessoes` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ==========================================
+-- TABELA: estoque_resumo (totais por empresa, mantidos pela aplicação)
+-- ==========================================
+DROP TABLE IF EXISTS `estoque_resumo`;
+CREATE TABLE `estoque_resumo` (
+  `empresa_id` INT NOT NULL,
+  `total_produtos` INT NOT NULL DEFAULT 0,
+  `quantidade_total` DECIMAL(20,3) NOT NULL DEFAULT 0.000,
+  `valor_custo_total` DECIMAL(24,5) NOT NULL DEFAULT 0.00000,
+  `valor_venda_total` DECIMAL(24,5) NOT NULL DEFAULT 0.00000,
+  `data_atualizacao` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`empresa_id`),
+  CONSTRAINT `fk_resumo_empresa` 
+    FOREIGN KEY (`empresa_id`) 
+    REFERENCES `empresas` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ==========================================
+-- TABELA: estoque_fotos (posição periódica do estoque por empresa)
+-- ==========================================
+DROP TABLE IF EXISTS `estoque_fotos_itens`;
+DROP TABLE IF EXISTS `estoque_fotos`;
+CREATE TABLE `estoque_fotos` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  `empresa_id` INT NOT NULL,
+  `data_referencia` TIMESTAMP NOT NULL COMMENT 'Instante da leitura de produtos',
+  `total_produtos` INT NOT NULL DEFAULT 0,
+  `quantidade_total` DECIMAL(20,3) NOT NULL DEFAULT 0.000,
+  `valor_custo_total` DECIMAL(24,5) NOT NULL DEFAULT 0.00000,
+  `valor_venda_total` DECIMAL(24,5) NOT NULL DEFAULT 0.00000,
+  `data_criacao` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_empresa_data` (`empresa_id`, `data_referencia`),
+  CONSTRAINT `fk_foto_empresa` 
+    FOREIGN KEY (`empresa_id`) 
+    REFERENCES `empresas` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ==========================================
+-- TABELA: estoque_fotos_itens (saldo e preços de cada produto na foto)
+-- ==========================================
+CREATE TABLE `estoque_fotos_itens` (
+  `foto_id` INT NOT NULL,
+  `produto_id` INT NOT NULL,
+  `quantidade` DECIMAL(10,3) NOT NULL,
+  `preco_custo` DECIMAL(10,2) NOT NULL,
+  `preco_venda` DECIMAL(10,2) NOT NULL,
+  PRIMARY KEY (`foto_id`, `produto_id`),
+  CONSTRAINT `fk_foto_item_foto` 
+    FOREIGN KEY (`foto_id`) 
+    REFERENCES `estoque_fotos` (`id`) 
+    ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ==========================================
+-- TABELA: tarefas (fila das tarefas em segundo plano)
+-- ==========================================
+DROP TABLE IF EXISTS `tarefas`;
+CREATE TABLE `tarefas` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT,
+  `empresa_id` INT NOT NULL,
+  `usuario_id` INT DEFAULT NULL,
+  `tipo` VARCHAR(50) NOT NULL,
+  `parametros` MEDIUMTEXT NOT NULL COMMENT 'JSON',
+  `status` ENUM('PENDENTE','EXECUTANDO','CONCLUIDA','FALHOU','CANCELADA') NOT NULL DEFAULT 'PENDENTE',
+  `tentativas` INT NOT NULL DEFAULT 0,
+  `max_tentativas` INT NOT NULL DEFAULT 3,
+  `processados` INT NOT NULL DEFAULT 0,
+  `total` INT DEFAULT NULL,
+  `resultado` MEDIUMTEXT DEFAULT NULL COMMENT 'JSON',
+  `erro` TEXT DEFAULT NULL,
+  `executor` VARCHAR(100) DEFAULT NULL COMMENT 'host:pid que está executando',
+  `heartbeat` TIMESTAMP(3) NULL DEFAULT NULL,
+  `disponivel_em` TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) COMMENT 'Nova tentativa só a partir daqui',
+  `data_criacao` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `data_inicio` TIMESTAMP NULL DEFAULT NULL,
+  `data_fim` TIMESTAMP NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_fila` (`status`, `disponivel_em`, `id`),
+  KEY `idx_empresa_status` (`empresa_id`, `status`, `id`),
+  CONSTRAINT `fk_tarefa_empresa` 
+    FOREIGN KEY (`empresa_id`) 
+    REFERENCES `empresas` (`id`) 
+    ON DELETE CASCADE,
+  CONSTRAINT `fk_tarefa_user` 
+    FOREIGN KEY (`usuario_id`) 
+    REFERENCES `usuarios` (`id`) 
+    ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ==========================================
+-- TABELA: schema_migracoes (versões de migrations/ já aplicadas)
+-- ==========================================
+DROP TABLE IF EXISTS `schema_migracoes`;
+CREATE TABLE `schema_migracoes` (
+  `versao` INT NOT NULL,
+  `nome` VARCHAR(150) NOT NULL,
+  `checksum` CHAR(64) DEFAULT NULL COMMENT 'SHA-256 do arquivo; NULL = criado por este script',
+  `duracao_ms` INT NOT NULL DEFAULT 0,
+  `data_aplicacao` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`versao`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- ==========================================
 -- VIEW: Estatísticas de Estoque por Empresa
 -- ==========================================
 DROP VIEW IF EXISTS `vw_valor_estoque`;
 CREATE VIEW `vw_valor_estoque` AS
 SELECT 
-  p.empresa_id,
-  COUNT(p.id) AS total_produtos,
-  SUM(p.quantidade) AS quantidade_total,
-  SUM(p.quantidade * p.preco_custo) AS valor_custo_total,
-  SUM(p.quantidade * p.preco_venda) AS valor_venda_total,
-  SUM(p.quantidade * (p.preco_venda - p.preco_custo)) AS lucro_potencial
-FROM produtos p
-WHERE p.ativo = 1
-GROUP BY p.empresa_id;
+  r.empresa_id,
+  r.total_produtos,
+  r.quantidade_total,
+  r.valor_custo_total,
+  r.valor_venda_total,
+  r.valor_venda_total - r.valor_custo_total AS lucro_potencial
+FROM estoque_resumo r;
 
 -- ==========================================
 -- DADOS INICIAIS
@@ -163,6 +325,26 @@ VALUES
   (1, '02', '7589764256821', 'SSD NVME 256GB Kingston', 'UN', 100.000, 200.00, 670.00, 1),
   (1, '03', '7891234567890', 'Memória RAM DDR4 8GB', 'UN', 50.000, 150.00, 350.00, 1);
 
+-- Resumo inicial de estoque
+INSERT INTO `estoque_resumo` (`empresa_id`, `total_produtos`, `quantidade_total`, `valor_custo_total`, `valor_venda_total`)
+SELECT empresa_id, COUNT(id), SUM(quantidade), SUM(quantidade * preco_custo), SUM(quantidade * preco_venda)
+FROM produtos
+WHERE ativo = 1
+GROUP BY empresa_id;
+
+-- Este script já cria o schema atual: as migrações existentes ficam registradas
+INSERT INTO `schema_migracoes` (`versao`, `nome`)
+VALUES 
+  (1, 'produtos_indices_empresa'),
+  (2, 'produtos_fulltext'),
+  (3, 'movimentacoes_saldo_indices'),
+  (4, 'estoque_resumo'),
+  (5, 'contagem_sessoes'),
+  (6, 'indices_por_usuario'),
+  (7, 'tarefas'),
+  (8, 'estoque_fotos'),
+  (9, 'movimentacoes_cadastro_exclusao');
+
 -- ==========================================
 -- VERIFICAÇÃO FINAL
 -- ==========================================
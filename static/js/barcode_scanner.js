@@ -5,7 +5,17 @@ let lastCode = '';
 let lastCodeTime = 0;
 const DEBOUNCE_TIME = 800;
 
-let requestInProgress = false;
+// Fila de leituras: enviada em lote por /api/contagem/batch e guardada
+// no localStorage para sobreviver a quedas de Wi-Fi e recarregamentos.
+const FILA_STORAGE_KEY = 'sysstock_fila_contagem';
+const LOTE_MAX = 50;
+const FLUSH_INTERVAL = 1500;
+
+let loteEmEnvio = null;
+// Lotes recusados pelo servidor (sessão encerrada, lote inválido): esperam o usuário reenviar ou mudar de sessão
+let lotesRejeitados = [];
+let filaLeituras = carregarFila();
+let flushTimer = null;
 
 function toggleCamera() {
     const btn = document.getElementById('btnCamera');
@@ -20,52 +30,9 @@ function toggleCamera() {
         }
 
         status.textContent = "Inicializando...";
-        
-        Quagga.init({
-            inputStream: {
-                name: "Live",
-                type: "LiveStream",
-                target: interactive,
-                constraints: {
-                    facingMode: "environment",
-                    width: { ideal: 1280 },
-                    height: { ideal: 720 }
-                },
-                area: { top: "0%", right: "0%", left: "0%", bottom: "0%" }
-            },
-            locator: { patchSize: "medium", halfSample: true },
-            numOfWorkers: navigator.hardwareConcurrency || 4,
-            decoder: {
-                readers: [
-                    "ean_reader", "ean_8_reader", "code_128_reader", 
-                    "code_39_reader", "upc_reader"
-                ]
-            },
-            locate: true,
-            frequency: 15
-        }, function (err) {
-            if (err) {
-                status.textContent = "Erro: " + err.name;
-                return;
-            }
-            Quagga.start();
-            cameraActive = true;
-            status.textContent = "✓ Ativa";
-            status.style.color = "lightgreen";
-            overlay.style.display = 'block';
-            btn.textContent = "⏸️ Parar Scanner";
-        });
-
-        Quagga.onDetected(function (result) {
-            if (isProcessing || requestInProgress) return;
-            const code = String(result.codeResult.code).trim();
-            if (!code || code.length < 3) return;
-            
-            const qtdInput = document.getElementById('inputQtd');
-            const quantidade = qtdInput ? parseFloat(qtdInput.value) || 1 : 1;
-            processarCodigo(code, quantidade);
-        });
-        
+        carregarQuagga()
+            .then(() => iniciarQuagga(btn, status, overlay, interactive))
+            .catch((e) => { status.textContent = "Erro: " + e.message; });
     } else {
         Quagga.stop();
         cameraActive = false;
@@ -76,6 +43,75 @@ function toggleCamera() {
     }
 }
 
+// O Quagga (~150 KB) só é baixado quando a câmera é ligada pela primeira vez;
+// quem usa leitor USB/Bluetooth ou digita o código nunca o carrega.
+let carregandoQuagga = null;
+
+function carregarQuagga() {
+    if (window.Quagga) return Promise.resolve();
+    if (!carregandoQuagga) {
+        carregandoQuagga = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = window.QUAGGA_URL;
+            script.async = true;
+            script.onload = resolve;
+            script.onerror = () => {
+                carregandoQuagga = null;
+                reject(new Error("leitor de código não carregou"));
+            };
+            document.head.appendChild(script);
+        });
+    }
+    return carregandoQuagga;
+}
+
+function iniciarQuagga(btn, status, overlay, interactive) {
+    Quagga.init({
+        inputStream: {
+            name: "Live",
+            type: "LiveStream",
+            target: interactive,
+            constraints: {
+                facingMode: "environment",
+                width: { ideal: 1280 },
+                height: { ideal: 720 }
+            },
+            area: { top: "0%", right: "0%", left: "0%", bottom: "0%" }
+        },
+        locator: { patchSize: "medium", halfSample: true },
+        numOfWorkers: navigator.hardwareConcurrency || 4,
+        decoder: {
+            readers: [
+                "ean_reader", "ean_8_reader", "code_128_reader", 
+                "code_39_reader", "upc_reader"
+            ]
+        },
+        locate: true,
+        frequency: 15
+    }, function (err) {
+        if (err) {
+            status.textContent = "Erro: " + err.name;
+            return;
+        }
+        Quagga.start();
+        cameraActive = true;
+        status.textContent = "✓ Ativa";
+        status.style.color = "lightgreen";
+        overlay.style.display = 'block';
+        btn.textContent = "⏸️ Parar Scanner";
+    });
+
+    Quagga.onDetected(function (result) {
+        if (isProcessing) return;
+        const code = String(result.codeResult.code).trim();
+        if (!code || code.length < 3) return;
+        
+        const qtdInput = document.getElementById('inputQtd');
+        const quantidade = qtdInput ? parseFloat(qtdInput.value) || 1 : 1;
+        processarCodigo(code, quantidade);
+    });
+}
+
 function processarCodigo(code, quantidade) {
     const currentTime = Date.now();
     if (code === lastCode && (currentTime - lastCodeTime) < DEBOUNCE_TIME) return;
@@ -83,36 +119,228 @@ function processarCodigo(code, quantidade) {
     lastCode = code;
     lastCodeTime = currentTime;
     isProcessing = true;
-    adicionarItemApi(code, quantidade);
+    enfileirarLeitura(code, quantidade);
+    isProcessing = false;
 }
 
-function adicionarItemApi(identifier, quantidade) {
-    if (requestInProgress) return;
-    requestInProgress = true;
-    
-    fetch('/api/contagem/add', {
+function carregarFila() {
+    try {
+        const salvo = JSON.parse(localStorage.getItem(FILA_STORAGE_KEY));
+        if (salvo && Array.isArray(salvo.pendentes)) {
+            loteEmEnvio = salvo.lote || null;
+            lotesRejeitados = Array.isArray(salvo.rejeitados) ? salvo.rejeitados : [];
+            return salvo.pendentes;
+        }
+    } catch (e) {
+        console.log("⚠️ Fila local ignorada:", e.message);
+    }
+    return [];
+}
+
+function salvarFila() {
+    try {
+        localStorage.setItem(FILA_STORAGE_KEY, JSON.stringify({
+            pendentes: filaLeituras, lote: loteEmEnvio, rejeitados: lotesRejeitados
+        }));
+    } catch (e) {
+        console.log("⚠️ Não foi possível salvar a fila local:", e.message);
+    }
+}
+
+function gerarLoteId() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
+// Sessões só são abertas por POST explícito; sem nenhuma, a primeira leitura abre uma
+let abrindoSessao = null;
+
+function garantirSessaoContagem() {
+    if (window.sessaoContagemId) return Promise.resolve(window.sessaoContagemId);
+    if (!abrindoSessao) {
+        abrindoSessao = fetch('/api/contagem/sessoes', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ zona: '' })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) throw new Error(data.message);
+            window.sessaoContagemId = data.sessao.id;
+            return data.sessao.id;
+        })
+        .finally(() => { abrindoSessao = null; });
+    }
+    return abrindoSessao;
+}
+
+function enfileirarLeitura(identifier, quantidade) {
+    if (!window.sessaoContagemId) {
+        garantirSessaoContagem()
+            .then(() => enfileirarLeitura(identifier, quantidade))
+            .catch(err => flashMensagem(`Não foi possível abrir a sessão: ${err.message}`, 'error'));
+        return;
+    }
+    // A sessão vai junto da leitura: trocar de sessão não move leituras ainda não enviadas
+    filaLeituras.push({
+        identifier: identifier, quantidade: quantidade, client_ts: Date.now(),
+        sessao_id: window.sessaoContagemId || null
+    });
+    salvarFila();
+    beep();
+    atualizarIndicadorFila();
+
+    if (filaLeituras.length >= LOTE_MAX) {
+        enviarFila();
+    } else if (!flushTimer) {
+        flushTimer = setTimeout(enviarFila, FLUSH_INTERVAL);
+    }
+}
+
+function atualizarIndicadorFila() {
+    const indicador = document.getElementById('filaPendentes');
+    if (!indicador) return;
+    const total = filaLeituras.length + (loteEmEnvio ? loteEmEnvio.itens.length : 0)
+        + lotesRejeitados.reduce((soma, lote) => soma + lote.itens.length, 0);
+    indicador.textContent = total;
+}
+
+function renderizarLotesRejeitados() {
+    const painel = document.getElementById('lotesRejeitados');
+    if (!painel) return;
+    painel.innerHTML = '';
+    painel.style.display = lotesRejeitados.length ? '' : 'none';
+    lotesRejeitados.forEach((lote, indice) => {
+        const linha = document.createElement('div');
+        linha.className = 'alert alert-error';
+        linha.innerHTML = `
+            <strong>${lote.itens.length} leitura(s) recusada(s):</strong> <span class="motivo"></span>
+            <div style="margin-top: 6px; display: flex; gap: 6px; flex-wrap: wrap;">
+                <button class="btn btn-secondary btn-sm" onclick="reenviarLoteRejeitado(${indice}, false)">🔁 Tentar de novo</button>
+                ${window.sessaoContagemId && window.sessaoContagemId !== lote.sessao_id
+                    ? `<button class="btn btn-primary btn-sm" onclick="reenviarLoteRejeitado(${indice}, true)">➡️ Enviar para a sessão atual</button>`
+                    : ''}
+                <button class="btn btn-danger btn-sm" onclick="descartarLoteRejeitado(${indice})">🗑️ Descartar</button>
+            </div>
+        `;
+        linha.querySelector('.motivo').textContent = lote.motivo;
+        painel.appendChild(linha);
+    });
+}
+
+// Devolve as leituras recusadas ao início da fila, na mesma sessão ou na atual
+function reenviarLoteRejeitado(indice, paraSessaoAtual) {
+    const lote = lotesRejeitados.splice(indice, 1)[0];
+    if (!lote) return;
+    if (paraSessaoAtual) {
+        lote.itens.forEach(item => { item.sessao_id = window.sessaoContagemId; });
+    }
+    filaLeituras.unshift(...lote.itens);
+    salvarFila();
+    renderizarLotesRejeitados();
+    atualizarIndicadorFila();
+    enviarFila();
+}
+
+function descartarLoteRejeitado(indice) {
+    const lote = lotesRejeitados[indice];
+    if (!lote || !confirm(`Descartar ${lote.itens.length} leitura(s) recusada(s)?`)) return;
+    lotesRejeitados.splice(indice, 1);
+    salvarFila();
+    renderizarLotesRejeitados();
+    atualizarIndicadorFila();
+}
+
+function enviarFila() {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+
+    // Um lote por vez; o que chegar nesse meio tempo entra no próximo
+    if (loteEmEnvio === null) {
+        if (filaLeituras.length === 0) return;
+        // Cada lote leva leituras de uma única sessão
+        const sessao = filaLeituras[0].sessao_id || null;
+        let n = 0;
+        while (n < filaLeituras.length && n < LOTE_MAX && (filaLeituras[n].sessao_id || null) === sessao) n++;
+        loteEmEnvio = { lote_id: gerarLoteId(), sessao_id: sessao, itens: filaLeituras.splice(0, n) };
+        salvarFila();
+    } else if (loteEmEnvio.enviando) {
+        return;
+    }
+
+    loteEmEnvio.enviando = true;
+    fetch('/api/contagem/batch', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ identifier: identifier, quantidade: quantidade })
+        body: JSON.stringify({ lote_id: loteEmEnvio.lote_id, sessao_id: loteEmEnvio.sessao_id, itens: loteEmEnvio.itens })
     })
-    .then(response => response.json())
-    .then(data => {
-        if (data.success) {
-            beep();
-            flashMensagem(data.message, 'success');
-            if (typeof window.fetchItensContagem === 'function') {
-                window.fetchItensContagem();
-            }
-        } else {
-            flashMensagem(data.message, 'error');
+    .then(response => response.json().then(data => ({ ok: response.ok, status: response.status, data: data })))
+    .then(({ ok, status, data }) => {
+        if (!ok && status >= 500) {
+            throw new Error(data.message || `HTTP ${status}`);
+        }
+        if (!ok || !data.success) {
+            // Recusado sem ser aplicado: as leituras ficam guardadas até o usuário decidir
+            lotesRejeitados.push({
+                sessao_id: loteEmEnvio.sessao_id, itens: loteEmEnvio.itens,
+                motivo: data.message || `HTTP ${status}`
+            });
+            loteEmEnvio = null;
+            salvarFila();
+            renderizarLotesRejeitados();
+            flashMensagem(data.message || `Lote recusado (HTTP ${status})`, 'error');
+            return;
+        }
+        // Lote aplicado (ou já aplicado antes, duplicado): não reenviar
+        loteEmEnvio = null;
+        salvarFila();
+
+        if (data.nao_encontrados && data.nao_encontrados.length) {
+            flashMensagem(`Produto(s) não encontrado(s): ${data.nao_encontrados.join(', ')}`, 'error');
+        } else if (data.aplicados) {
+            flashMensagem(`${data.aplicados} leitura(s) registrada(s).`, 'success');
+        }
+        // Com o stream conectado as linhas do lote chegam por SSE
+        if (typeof window.fetchItensContagem === 'function' && !window.streamContagemAtivo) {
+            window.fetchItensContagem();
         }
     })
+    .catch(err => {
+        // Sem rede: mantém o lote (mesmo lote_id) para reenviar sem duplicar
+        console.log("📡 Lote pendente, nova tentativa em breve:", err.message);
+        if (loteEmEnvio) loteEmEnvio.enviando = false;
+        salvarFila();
+    })
     .finally(() => {
-        isProcessing = false;
-        requestInProgress = false;
+        atualizarIndicadorFila();
+        if ((loteEmEnvio || filaLeituras.length) && !flushTimer) {
+            flushTimer = setTimeout(enviarFila, loteEmEnvio ? FLUSH_INTERVAL * 2 : 0);
+        }
     });
 }
 
+window.addEventListener('online', enviarFila);
+window.addEventListener('load', function() {
+    if (loteEmEnvio) loteEmEnvio.enviando = false;
+    atualizarIndicadorFila();
+    renderizarLotesRejeitados();
+    enviarFila();
+});
+
+function renderizarLinhaContagem(row, item) {
+    row.dataset.produtoId = item.produto_id;
+    row.innerHTML = `
+        <td>${item.codigo}</td>
+        <td>${item.descricao}</td>
+        <td style="font-weight:bold;">${Number(item.quantidade).toFixed(3)}</td>
+        <td>
+            <button class="btn btn-danger btn-sm" onclick="removerItemLocal('${item.codigo}')">🗑️</button>
+        </td>
+    `;
+}
+
 function atualizarTabelaContagem(itens) {
     const tabelaBody = document.querySelector('#tabelaContagem tbody');
     if (!tabelaBody) return;
@@ -125,18 +353,34 @@ function atualizarTabelaContagem(itens) {
         return;
     }
 
-    itens.sort((a, b) => (b.id || 0) - (a.id || 0));
+    itens.sort((a, b) => (b.versao || 0) - (a.versao || 0));
 
     itens.forEach(item => {
-        const row = tabelaBody.insertRow();
-        row.innerHTML = `
-            <td>${item.codigo}</td>
-            <td>${item.descricao}</td>
-            <td style="font-weight:bold;">${Number(item.quantidade).toFixed(3)}</td>
-            <td>
-                <button class="btn btn-danger btn-sm" onclick="removerItemLocal('${item.codigo}')">🗑️</button>
-            </td>
-        `;
+        renderizarLinhaContagem(tabelaBody.insertRow(), item);
+    });
+}
+
+// Aplica só as linhas alteradas (?since= ou resposta do /add) sem redesenhar a tabela
+function aplicarDeltaContagem(itens) {
+    const tabelaBody = document.querySelector('#tabelaContagem tbody');
+    if (!tabelaBody || !itens || itens.length === 0) return;
+
+    if (window.contagemItens.length === 0) {
+        tabelaBody.innerHTML = '';
+    }
+
+    itens.forEach(item => {
+        const idx = window.contagemItens.findIndex(i => i.produto_id === item.produto_id);
+        let row = tabelaBody.querySelector(`tr[data-produto-id="${item.produto_id}"]`);
+        if (idx >= 0) {
+            window.contagemItens[idx] = item;
+        } else {
+            window.contagemItens.unshift(item);
+        }
+        if (!row) {
+            row = tabelaBody.insertRow(0);
+        }
+        renderizarLinhaContagem(row, item);
     });
 }
 
@@ -152,13 +396,13 @@ function removerItemLocal(codigo) {
     fetch('/api/contagem/add', {
         method: 'POST',
         headers: {'Content-Type': 'application/json'},
-        body: JSON.stringify({ identifier: String(codigo), quantidade: -item.quantidade })
+        body: JSON.stringify({ identifier: String(codigo), quantidade: -item.quantidade, sessao_id: window.sessaoContagemId || null })
     })
     .then(response => response.json())
     .then(data => {
         if (data.success) {
             flashMensagem('✅ Item zerado!', 'success');
-            window.fetchItensContagem();
+            aplicarDeltaContagem([data.item]);
         }
     });
 }
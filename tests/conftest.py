@@ -0,0 +1,150 @@
+"""Fixtures dos testes.
+
+Os testes marcados com o fixture `banco` precisam de um MySQL 8 descartável:
+TEST_DB_HOST, TEST_DB_USER, TEST_DB_PASSWORD e TEST_DB_PORT (usuário com
+permissão de CREATE/DROP DATABASE). Um schema sysstock_teste_<aleatório> é
+criado a partir do setup_master.sql e apagado no fim; cada teste recomeça dos
+dados iniciais do script. Sem TEST_DB_HOST esses testes são pulados.
+
+    TEST_DB_HOST=127.0.0.1 TEST_DB_USER=root TEST_DB_PASSWORD=... python -m pytest -q
+"""
+import os
+import secrets
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+# Antes do import: o app fixa SHARED_DIR ao carregar
+os.environ.setdefault('SYSSTOCK_SHARED_DIR', tempfile.mkdtemp(prefix='sysstock-testes-'))
+
+import mysql.connector  # noqa: E402
+
+import app as sysstock  # noqa: E402
+
+EMPRESA_ID = 1  # 'zactiti' do setup_master.sql
+ADMIN_ID = 2  # Carlos / 123 (hash SHA2 legado)
+
+
+def conectar_servidor(**extra):
+    return mysql.connector.connect(
+        host=os.environ['TEST_DB_HOST'],
+        user=os.getenv('TEST_DB_USER', 'root'),
+        password=os.getenv('TEST_DB_PASSWORD', ''),
+        port=int(os.getenv('TEST_DB_PORT', 3306)),
+        autocommit=True,
+        **extra
+    )
+
+
+@pytest.fixture(scope='session')
+def schema_teste():
+    if not os.getenv('TEST_DB_HOST'):
+        pytest.skip('defina TEST_DB_HOST para rodar os testes com MySQL')
+    nome = f'sysstock_teste_{secrets.token_hex(4)}'
+    with open(os.path.join(RAIZ, 'setup_master.sql'), encoding='utf-8') as f:
+        script = f.read().replace('`sysstock`', f'`{nome}`')
+
+    sysstock.DB_CONFIG.update(
+        host=os.environ['TEST_DB_HOST'],
+        user=os.getenv('TEST_DB_USER', 'root'),
+        password=os.getenv('TEST_DB_PASSWORD', ''),
+        port=int(os.getenv('TEST_DB_PORT', 3306)),
+        database=nome,
+    )
+    sysstock._pool = None
+    yield script
+
+    sysstock._pool = None
+    conn = conectar_servidor()
+    try:
+        conn.cursor().execute(f'DROP DATABASE IF EXISTS `{nome}`')
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def banco(schema_teste):
+    """Schema recriado pelo setup_master.sql: dados iniciais a cada teste"""
+    conn = conectar_servidor()
+    try:
+        cursor = conn.cursor()
+        # O script derruba as tabelas na ordem de criação: sem isto a segunda execução esbarra nas FKs
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for resultado in cursor.execute(schema_teste, multi=True):
+            if resultado.with_rows:
+                resultado.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+@pytest.fixture(autouse=True)
+def isolado(tmp_path, monkeypatch):
+    """Gerações, sessões e caches em memória novos por teste (ids do banco se repetem entre testes)"""
+    monkeypatch.setattr(sysstock, 'geracoes', sysstock.GeracoesCompartilhadas(str(tmp_path / 'geracoes.bin')))
+    monkeypatch.setattr(sysstock, 'escritas', sysstock.GeracoesCompartilhadas(str(tmp_path / 'escritas.bin')))
+    armazem = sysstock.ArmazemSessoes(str(tmp_path / 'sessoes'), sysstock.app.session_interface.armazem.ttl)
+    monkeypatch.setattr(sysstock.app.session_interface, 'armazem', armazem)
+    for cache in (sysstock.cache_respostas, sysstock.cache_identificadores, sysstock.cache_empresas):
+        cache._dados.clear()
+    for limitador in (sysstock.limitador_ip, sysstock.limitador_empresa):
+        limitador._dados.clear()
+    sysstock.app.config['TESTING'] = True
+
+
+@pytest.fixture
+def cliente():
+    return sysstock.app.test_client()
+
+
+def entrar(cliente, usuario='Carlos', senha='123', empresa='zactiti'):
+    resposta = cliente.post('/login', data={'empresa': empresa, 'usuario': usuario, 'senha': senha})
+    return resposta.get_json()
+
+
+@pytest.fixture
+def logado(banco, cliente):
+    """Cliente com o admin da empresa 1 logado"""
+    assert entrar(cliente)['success']
+    return cliente
+
+
+def consultar(query, params=(), single=False):
+    """Leitura direta no schema de teste, fora das conexões do app"""
+    conn = conectar_servidor(database=sysstock.DB_CONFIG['database'])
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(query, params)
+        return cursor.fetchone() if single else cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def executar(query, params=()):
+    conn = conectar_servidor(database=sysstock.DB_CONFIG['database'])
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+def resumo_recalculado(emp_id=EMPRESA_ID):
+    """Totais de produtos ativos somados do zero, para comparar com estoque_resumo"""
+    return consultar("""
+        SELECT COUNT(id) AS total_produtos, COALESCE(SUM(quantidade), 0) AS quantidade_total,
+               COALESCE(SUM(quantidade * preco_custo), 0) AS valor_custo_total,
+               COALESCE(SUM(quantidade * preco_venda), 0) AS valor_venda_total
+        FROM produtos WHERE empresa_id = %s AND ativo = 1
+    """, (emp_id,), single=True)
+
+
+def resumo_gravado(emp_id=EMPRESA_ID):
+    return consultar("""
+        SELECT total_produtos, quantidade_total, valor_custo_total, valor_venda_total
+        FROM estoque_resumo WHERE empresa_id = %s
+    """, (emp_id,), single=True)
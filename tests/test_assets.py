@@ -0,0 +1,13 @@
+import app as sysstock
+
+
+def test_build_falha_sem_quagga_versionado(monkeypatch):
+    monkeypatch.setattr(sysstock, 'QUAGGA_ARQUIVO', 'vendor/quagga-inexistente.min.js')
+    resultado = sysstock.app.test_cli_runner().invoke(args=['assets'])
+    assert resultado.exit_code == 1
+    assert 'quagga-inexistente.min.js ausente' in resultado.output
+
+
+def test_scanner_nao_usa_cdn():
+    with sysstock.app.test_request_context('/'):
+        assert sysstock.scanner_url().startswith(('/static/', sysstock.ASSETS_URL))
@@ -0,0 +1,121 @@
+import os
+from contextlib import contextmanager
+
+from flask import Response, session
+
+import app as sysstock
+
+
+@contextmanager
+def contexto(caminho='/x', user_id=2, **headers):
+    """Request com usuário e empresa na sessão: sem empresa a rota não passa pelo cache"""
+    with sysstock.app.test_request_context(caminho, headers=headers):
+        session.update(user_id=user_id, empresa_id=1)
+        yield
+
+
+def pagina_em_cache(chamadas):
+    @sysstock.resposta_em_cache(lambda: ['teste:1'])
+    def pagina():
+        chamadas.append(1)
+        return Response('corpo', content_type='text/plain')
+    return pagina
+
+
+def test_etag_304_sem_executar_a_rota():
+    chamadas = []
+    pagina = pagina_em_cache(chamadas)
+    with contexto():
+        primeira = pagina()
+    assert primeira.status_code == 200 and primeira.get_etag()[0]
+    etag = primeira.get_etag()[0]
+
+    with contexto(**{'If-None-Match': f'"{etag}"'}):
+        segunda = pagina()
+    assert segunda.status_code == 304
+    assert len(chamadas) == 1
+
+
+def test_etag_muda_com_a_geracao():
+    pagina = pagina_em_cache([])
+    with contexto():
+        antes = pagina().get_etag()[0]
+    sysstock.geracoes.incrementar('teste:1')
+    with contexto():
+        depois = pagina().get_etag()[0]
+    assert antes != depois
+
+
+def test_arquivo_de_geracoes_recriado_nao_repete_etag(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'ger.bin')
+    monkeypatch.setattr(sysstock, 'geracoes', sysstock.GeracoesCompartilhadas(caminho))
+    pagina = pagina_em_cache([])
+    with contexto():
+        antes = pagina().get_etag()[0]
+    epoca = sysstock.geracoes.epoca()
+
+    # Reboot / limpeza do /tmp: contadores voltam a zero, a época não se repete
+    os.remove(caminho)
+    monkeypatch.setattr(sysstock, 'geracoes', sysstock.GeracoesCompartilhadas(caminho))
+    assert sysstock.geracoes.ler('teste:1') == 0
+    assert sysstock.geracoes.epoca() != epoca
+    with contexto():
+        depois = pagina().get_etag()[0]
+    assert antes != depois
+
+
+def test_geracoes_mantem_a_epoca_ao_reabrir(tmp_path):
+    caminho = str(tmp_path / 'ger.bin')
+    primeira = sysstock.GeracoesCompartilhadas(caminho)
+    primeira.incrementar('k')
+    segunda = sysstock.GeracoesCompartilhadas(caminho)
+    assert segunda.epoca() == primeira.epoca()
+    assert segunda.ler('k') == 1
+
+
+def test_lista_da_contagem_revalida_e_muda_apos_leitura(logado):
+    sessao = logado.post('/api/contagem/sessoes', json={'zona': 'A'}).get_json()['sessao']['id']
+    primeira = logado.get(f'/api/contagem/list?sessao_id={sessao}')
+    etag = primeira.headers['ETag']
+    assert logado.get(f'/api/contagem/list?sessao_id={sessao}', headers={'If-None-Match': etag}).status_code == 304
+
+    logado.post('/api/contagem/batch', json={'sessao_id': sessao, 'itens': [{'identifier': '01'}]})
+    depois = logado.get(f'/api/contagem/list?sessao_id={sessao}', headers={'If-None-Match': etag})
+    assert depois.status_code == 200
+    assert depois.headers['ETag'] != etag
+
+
+
+def test_master_sem_empresa_nao_passa_pelo_cache():
+    cliente = sysstock.app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao.update(user_id=1, is_master=True, is_admin=True)
+    for rota in ('/dashboard', '/produtos', '/movimentacoes'):
+        resposta = cliente.get(rota)
+        assert resposta.status_code == 302 and resposta.headers['Location'].endswith('/master/empresas')
+    assert cliente.get('/usuarios').status_code == 302
+    for rota in ('/api/produtos/busca?q=a', '/api/movimentacoes', '/api/contagem/list',
+                 '/api/estoque/posicao?data=2024-01-01', '/api/relatorios/estoque'):
+        resposta = cliente.get(rota)
+        assert resposta.status_code == 403 and 'ETag' not in resposta.headers
+
+
+def test_etag_separa_usuario_e_query_string():
+    pagina = pagina_em_cache([])
+    etags = []
+    for caminho, user_id in (('/x', 2), ('/x', 2), ('/x', 3), ('/x?pagina=2', 2)):
+        with contexto(caminho, user_id):
+            etags.append(pagina().get_etag()[0])
+    assert etags[0] == etags[1]
+    assert len(set(etags)) == 3
+
+
+def test_resposta_guardada_e_reaproveitada_sem_executar_a_rota():
+    chamadas = []
+    pagina = pagina_em_cache(chamadas)
+    with contexto():
+        primeira = pagina()
+    with contexto():
+        segunda = pagina()
+    assert segunda.get_data() == primeira.get_data() == b'corpo'
+    assert len(chamadas) == 1
@@ -0,0 +1,187 @@
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+import app as sysstock
+from conftest import consultar, resumo_gravado, resumo_recalculado
+
+
+def abrir_sessao(cliente, zona=''):
+    resposta = cliente.post('/api/contagem/sessoes', json={'zona': zona}).get_json()
+    assert resposta['success']
+    return resposta['sessao']['id']
+
+
+def lote(cliente, sessao_id, itens, lote_id=None):
+    return cliente.post('/api/contagem/batch', json={'sessao_id': sessao_id, 'lote_id': lote_id, 'itens': itens})
+
+
+def itens_da_sessao(sessao_id):
+    return {row['produto_id']: row['quantidade'] for row in consultar(
+        "SELECT produto_id, quantidade FROM contagem_itens WHERE sessao_id = %s", (sessao_id,)
+    )}
+
+
+def test_sem_sessao_leitura_e_recusada_e_nada_e_criado(logado):
+    resposta = lote(logado, None, [{'identifier': '01'}])
+    assert resposta.status_code == 409 and resposta.get_json()['sem_sessao']
+    assert logado.get('/api/contagem/list').get_json()['sessao'] is None
+    assert consultar("SELECT COUNT(*) AS n FROM contagem_sessoes", single=True)['n'] == 0
+
+
+def test_leituras_do_mesmo_produto_somam_numa_linha(logado):
+    sessao = abrir_sessao(logado)
+    logado.post('/api/contagem/add', json={'sessao_id': sessao, 'identifier': '01', 'quantidade': 2})
+    logado.post('/api/contagem/add', json={'sessao_id': sessao, 'identifier': '7589764356821', 'quantidade': 3})
+    assert itens_da_sessao(sessao) == {1: Decimal('5.000')}
+
+
+def test_lote_reenviado_e_aplicado_uma_vez(logado):
+    sessao = abrir_sessao(logado)
+    itens = [{'identifier': '01', 'quantidade': 2}, {'identifier': '02'}, {'identifier': 'inexistente'}]
+    primeira = lote(logado, sessao, itens, lote_id='aparelho-1:1').get_json()
+    assert primeira['aplicados'] == 2 and primeira['nao_encontrados'] == ['inexistente']
+
+    reenvio = lote(logado, sessao, itens, lote_id='aparelho-1:1').get_json()
+    assert reenvio['success'] and reenvio['duplicado']
+    assert itens_da_sessao(sessao) == {1: Decimal('2.000'), 2: Decimal('1.000')}
+
+    lote(logado, sessao, itens, lote_id='aparelho-1:2')
+    assert itens_da_sessao(sessao) == {1: Decimal('4.000'), 2: Decimal('2.000')}
+
+
+def test_lista_com_since_traz_so_o_que_mudou(logado):
+    sessao = abrir_sessao(logado)
+    lote(logado, sessao, [{'identifier': '01'}, {'identifier': '02'}])
+    completa = logado.get(f'/api/contagem/list?sessao_id={sessao}').get_json()
+    assert completa['completo'] and len(completa['itens']) == 2
+
+    lote(logado, sessao, [{'identifier': '03'}])
+    delta = logado.get(f"/api/contagem/list?sessao_id={sessao}&since={completa['versao']}").get_json()
+    assert not delta['completo']
+    assert [item['codigo'] for item in delta['itens']] == ['03']
+    assert delta['versao'] > completa['versao']
+
+    nada = logado.get(f"/api/contagem/list?sessao_id={sessao}&since={delta['versao']}").get_json()
+    assert nada['itens'] == [] and nada['versao'] == delta['versao']
+
+    # Zerar invalida o delta: quem estava numa versão anterior recebe a lista completa
+    logado.post('/api/contagem/clear', json={'sessao_id': sessao})
+    depois = logado.get(f"/api/contagem/list?sessao_id={sessao}&since={delta['versao']}").get_json()
+    assert depois['completo'] and depois['itens'] == []
+
+
+def test_finalizar_mescla_sessoes_no_estoque(logado):
+    a = abrir_sessao(logado, 'A')
+    b = abrir_sessao(logado, 'B')
+    lote(logado, a, [{'identifier': '01', 'quantidade': 4}, {'identifier': '02', 'quantidade': 10}])
+    lote(logado, b, [{'identifier': '01', 'quantidade': 6}])
+
+    resposta = logado.post('/api/contagem/finalizar',
+                           json={'sessoes': [a, b], 'regra': 'SOMAR', 'segundo_plano': False}).get_json()
+    assert resposta['success'] and resposta['total_itens'] == 2
+
+    quantidades = {row['id']: row['quantidade'] for row in consultar("SELECT id, quantidade FROM produtos")}
+    assert quantidades == {1: Decimal('10.000'), 2: Decimal('10.000'), 3: Decimal('50.000')}
+    movimentos = consultar("SELECT produto_id, tipo, quantidade, saldo FROM movimentacoes ORDER BY produto_id")
+    assert [(m['produto_id'], m['tipo'], m['saldo']) for m in movimentos] == [
+        (1, 'CONTAGEM', Decimal('10.000')), (2, 'CONTAGEM', Decimal('10.000'))
+    ]
+    assert resumo_gravado() == resumo_recalculado()
+    status = consultar("SELECT status FROM contagem_sessoes WHERE id IN (%s, %s)", (a, b))
+    assert {row['status'] for row in status} == {'FINALIZADA'}
+    assert itens_da_sessao(a) == {} and itens_da_sessao(b) == {}
+
+
+def test_finalizar_recusar_conflito_nao_altera_nada(logado):
+    a = abrir_sessao(logado, 'A')
+    b = abrir_sessao(logado, 'B')
+    lote(logado, a, [{'identifier': '01', 'quantidade': 4}])
+    lote(logado, b, [{'identifier': '01', 'quantidade': 6}])
+
+    resposta = logado.post('/api/contagem/finalizar',
+                           json={'sessoes': [a, b], 'regra': 'RECUSAR', 'segundo_plano': False})
+    assert resposta.status_code == 409 and resposta.get_json()['conflitos'] == ['01']
+    assert consultar("SELECT quantidade FROM produtos WHERE id = 1", single=True)['quantidade'] == Decimal('15.000')
+    assert consultar("SELECT COUNT(*) AS n FROM movimentacoes", single=True)['n'] == 0
+    assert itens_da_sessao(a) == {1: Decimal('4.000')}
+
+
+def test_sessao_finalizada_recusa_novas_leituras(logado):
+    sessao = abrir_sessao(logado)
+    lote(logado, sessao, [{'identifier': '01'}])
+    logado.post('/api/contagem/finalizar', json={'sessao_id': sessao, 'segundo_plano': False})
+    resposta = lote(logado, sessao, [{'identifier': '01'}])
+    assert resposta.status_code == 409 and resposta.get_json()['sessao_encerrada']
+
+
+def test_finalizar_com_sessao_nula_e_recusado(cliente):
+    with cliente.session_transaction() as sessao:
+        sessao.update(user_id=2, empresa_id=1, is_admin=True)
+    resposta = cliente.post('/api/contagem/finalizar', json={'sessoes': [None], 'segundo_plano': False})
+    assert resposta.status_code == 400
+    assert 'inválida' in resposta.get_json()['message'] and 'null' in resposta.get_json()['message']
+
+
+def sessao_selecionada(cliente):
+    with cliente.session_transaction() as sessao:
+        return sessao.get('contagem_sessao_id')
+
+
+def test_finalizar_em_ndjson_solta_a_sessao_selecionada(logado):
+    sessao = abrir_sessao(logado)
+    lote(logado, sessao, [{'identifier': '01'}])
+    assert sessao_selecionada(logado) == sessao
+
+    resposta = logado.post('/api/contagem/finalizar', headers={'Accept': 'application/x-ndjson'},
+                           json={'sessoes': [sessao], 'segundo_plano': False})
+    assert resposta.get_data(as_text=True).strip().splitlines()[-1].find('"concluido"') > 0
+    assert sessao_selecionada(logado) is None
+
+
+def test_finalizar_em_segundo_plano_solta_a_sessao_selecionada(logado):
+    sessao = abrir_sessao(logado)
+    lote(logado, sessao, [{'identifier': '01'}])
+    resposta = logado.post('/api/contagem/finalizar', json={'sessoes': [sessao], 'segundo_plano': True})
+    assert resposta.status_code == 202
+    assert sessao_selecionada(logado) is None
+
+
+def mesclar(regra, itens):
+    """Roda o SQL da regra num SQLite em memória; itens = (sessao_id, produto_id, quantidade, data_atualizacao)"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE contagem_itens (sessao_id, produto_id, quantidade, data_atualizacao)")
+    conn.executemany("INSERT INTO contagem_itens VALUES (?, ?, ?, ?)", itens)
+    sessoes = sorted({item[0] for item in itens})
+    sql = sysstock.CONTAGEM_MESCLA_SQL[regra].format(sessoes=', '.join(['?'] * len(sessoes)))
+    return dict(conn.execute(sql, sessoes).fetchall())
+
+
+ITENS_MESCLA = [
+    (1, 10, 4, '2024-05-01 10:00:00'), (2, 10, 6, '2024-05-01 09:00:00'),
+    (1, 20, 3, '2024-05-01 08:00:00'), (2, 20, 2, '2024-05-01 08:00:00'),
+    (2, 30, 7, '2024-05-01 07:00:00'),
+]
+
+
+@pytest.mark.parametrize('regra, esperado', [
+    ('SOMAR', {10: 10, 20: 5, 30: 7}),
+    ('MAIOR', {10: 6, 20: 3, 30: 7}),
+    # Mais recente vence; no empate de horário, a sessão mais nova
+    ('ULTIMA', {10: 4, 20: 2, 30: 7}),
+])
+def test_regras_de_mescla(regra, esperado):
+    assert mesclar(regra, ITENS_MESCLA) == esperado
+
+
+def test_toda_regra_tem_sql_e_recusar_copia_como_somar():
+    assert set(sysstock.CONTAGEM_MESCLA_SQL) == set(sysstock.CONTAGEM_REGRAS)
+    assert sysstock.CONTAGEM_MESCLA_SQL['RECUSAR'] is sysstock.CONTAGEM_MESCLA_SQL['SOMAR']
+    sem_repetidos = [item for item in ITENS_MESCLA if item[1] == 30] + [(1, 40, 1, '2024-05-01 07:00:00')]
+    assert mesclar('RECUSAR', sem_repetidos) == {30: 7, 40: 1}
+
+
+def test_mensagem_de_conflito_lista_os_produtos():
+    mensagem = sysstock.mensagem_conflito({'conflitos': ['01', '02']})
+    assert mensagem.startswith('2 produto(s)') and '01, 02' in mensagem
@@ -0,0 +1,202 @@
+import io
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import app as sysstock
+from conftest import EMPRESA_ID, consultar, executar, resumo_gravado, resumo_recalculado
+
+SALDOS_INICIAIS = {1: Decimal('15.000'), 2: Decimal('100.000'), 3: Decimal('50.000')}
+SINAL = {'ENTRADA': 1, 'SAIDA': -1, 'AJUSTE': 1}
+
+
+def lancar(cliente, *movimentos):
+    return cliente.post('/api/estoque/movimentos', json={'movimentos': list(movimentos)})
+
+
+def importar(cliente, texto):
+    return cliente.post(
+        '/produtos/importar',
+        data={'arquivo': (io.BytesIO(texto.encode('utf-8')), 'produtos.csv')},
+        headers={'Accept': 'application/json'},
+    ).get_json()
+
+
+def movimentacoes():
+    return consultar("SELECT produto_id, tipo, quantidade, saldo FROM movimentacoes ORDER BY id")
+
+
+# ==================== LANÇAMENTOS ====================
+
+def test_lancamentos_encadeiam_saldo_e_atualizam_resumo(logado):
+    resposta = lancar(
+        logado,
+        {'produto_id': 1, 'tipo': 'ENTRADA', 'quantidade': 5},
+        {'produto_id': 1, 'tipo': 'SAIDA', 'quantidade': 2},
+        {'identifier': '02', 'tipo': 'AJUSTE', 'quantidade': -10.5},
+    )
+    assert resposta.status_code == 200
+    produtos = resposta.get_json()['produtos']
+    assert produtos['1']['quantidade'] == 18.0 and produtos['2']['quantidade'] == 89.5
+
+    saldos = dict(SALDOS_INICIAIS)
+    for m in movimentacoes():
+        saldos[m['produto_id']] += SINAL[m['tipo']] * m['quantidade']
+        assert m['saldo'] == saldos[m['produto_id']]
+    atuais = {row['id']: row['quantidade'] for row in consultar("SELECT id, quantidade FROM produtos")}
+    assert atuais == saldos
+    assert resumo_gravado() == resumo_recalculado()
+
+
+def test_lote_com_versao_antiga_nao_aplica_nada(logado):
+    versao = consultar("SELECT versao FROM produtos WHERE id = 1", single=True)['versao']
+    assert lancar(logado, {'produto_id': 1, 'tipo': 'ENTRADA', 'quantidade': 1, 'versao': versao}).status_code == 200
+
+    resposta = lancar(
+        logado,
+        {'produto_id': 2, 'tipo': 'ENTRADA', 'quantidade': 1},
+        {'produto_id': 1, 'tipo': 'ENTRADA', 'quantidade': 1, 'versao': versao},
+    )
+    assert resposta.status_code == 409
+    assert resposta.get_json()['conflitos'][0]['produto_id'] == 1
+    assert consultar("SELECT quantidade FROM produtos WHERE id = 2", single=True)['quantidade'] == Decimal('100.000')
+    assert len(movimentacoes()) == 1
+
+
+def test_saida_acima_do_saldo_nao_aplica_nada(logado):
+    resposta = lancar(
+        logado,
+        {'produto_id': 2, 'tipo': 'ENTRADA', 'quantidade': 1},
+        {'produto_id': 1, 'tipo': 'SAIDA', 'quantidade': 16},
+    )
+    assert resposta.status_code == 409
+    assert resposta.get_json()['insuficientes'] == [{'produto_id': 1, 'quantidade_atual': 15.0, 'saldo_final': -1.0}]
+    assert movimentacoes() == []
+    assert consultar("SELECT quantidade FROM produtos WHERE id = 2", single=True)['quantidade'] == Decimal('100.000')
+
+    # Zerar é permitido
+    assert lancar(logado, {'produto_id': 1, 'tipo': 'SAIDA', 'quantidade': 15}).status_code == 200
+
+
+def test_cadastro_e_exclusao_entram_no_historico(logado):
+    logado.post('/produto/novo', data={'codigo': 'Z0', 'descricao': 'Zerado', 'quantidade': '0', 'custo': '1', 'venda': '2'})
+    novo = consultar("SELECT id FROM produtos WHERE codigo = 'Z0'", single=True)['id']
+    logado.get('/produto/excluir/2')
+
+    assert [(m['produto_id'], m['tipo'], m['quantidade'], m['saldo']) for m in movimentacoes()] == [
+        (novo, 'CADASTRO', Decimal('0.000'), Decimal('0.000')),
+        (2, 'EXCLUSAO', Decimal('-100.000'), Decimal('0.000')),
+    ]
+    assert resumo_gravado() == resumo_recalculado()
+
+
+# ==================== IMPORTAÇÃO ====================
+
+PLANILHA = (
+    "codigo;descricao;quantidade;custo;venda\n"
+    "01;Cabo SATA 50cm;20;50;150\n"
+    "NOVO;Produto novo;0;1,50;3\n"
+    "SEM;;1;1;1\n"
+)
+
+
+def test_importacao_repetida_nao_duplica_produtos_nem_movimentos(logado):
+    primeira = importar(logado, PLANILHA)
+    assert primeira['gravadas'] == 2
+    assert [e['linha'] for e in primeira['erros']] == [4]
+    lancados = movimentacoes()
+    novo = consultar("SELECT id FROM produtos WHERE codigo = 'NOVO'", single=True)['id']
+    assert [(m['produto_id'], m['tipo'], m['quantidade'], m['saldo']) for m in lancados] == [
+        (1, 'AJUSTE', Decimal('5.000'), Decimal('20.000')),
+        (novo, 'CADASTRO', Decimal('0.000'), Decimal('0.000')),
+    ]
+    assert resumo_gravado() == resumo_recalculado()
+
+    segunda = importar(logado, PLANILHA)
+    assert segunda['gravadas'] == 2
+    assert consultar("SELECT COUNT(*) AS n FROM produtos WHERE codigo IN ('01', 'NOVO')", single=True)['n'] == 2
+    assert movimentacoes() == lancados
+    assert resumo_gravado() == resumo_recalculado()
+
+
+def test_importacao_reativa_produto_excluido(logado):
+    logado.get('/produto/excluir/1')
+    importar(logado, "codigo;descricao;quantidade\n01;Cabo SATA 50cm;8\n")
+    produto = consultar("SELECT ativo, quantidade FROM produtos WHERE id = 1", single=True)
+    assert produto == {'ativo': 1, 'quantidade': Decimal('8.000')}
+    assert [m['tipo'] for m in movimentacoes()] == ['EXCLUSAO', 'CADASTRO']
+    assert resumo_gravado() == resumo_recalculado()
+
+
+# ==================== POSIÇÃO NUMA DATA ====================
+
+def test_posicao_a_partir_da_foto_bate_com_o_estoque(logado):
+    with sysstock.app.app_context():
+        foto = sysstock.criar_foto_estoque(sysstock.get_db_connection(escrita=True), EMPRESA_ID)
+    assert foto['total_produtos'] == 3
+
+    lancar(logado, {'produto_id': 1, 'tipo': 'ENTRADA', 'quantidade': 5})
+    logado.post('/produto/novo', data={'codigo': 'Z0', 'descricao': 'Zerado', 'quantidade': '0', 'custo': '1', 'venda': '2'})
+    logado.post('/produto/novo', data={'codigo': 'Z7', 'descricao': 'Sete', 'quantidade': '7', 'custo': '1', 'venda': '2'})
+    logado.get('/produto/excluir/2')
+
+    # Foto há duas horas e lançamentos há uma: meia hora atrás sai da foto mais o delta
+    executar("UPDATE estoque_fotos SET data_referencia = data_referencia - INTERVAL 2 HOUR")
+    executar("UPDATE movimentacoes SET data_hora = data_hora - INTERVAL 1 HOUR")
+    with sysstock.app.app_context():
+        agora = sysstock.agora_banco()
+        depois = sysstock.posicao_estoque(EMPRESA_ID, agora - timedelta(minutes=30))
+        antes = sysstock.posicao_estoque(EMPRESA_ID, agora - timedelta(minutes=90))
+        sem_foto = sysstock.posicao_estoque(EMPRESA_ID, agora - timedelta(hours=3))
+
+    atual = resumo_recalculado()
+    assert not depois['atual'] and depois['foto_id'] == foto['id']
+    assert depois['total_produtos'] == atual['total_produtos'] == 4
+    for campo in ('quantidade_total', 'valor_custo_total', 'valor_venda_total'):
+        assert depois[campo] == pytest.approx(float(atual[campo]))
+
+    assert antes['total_produtos'] == 3 and antes['produtos_movimentados'] == 0
+    assert antes['quantidade_total'] == pytest.approx(float(foto['quantidade_total']))
+    assert sem_foto is None
+
+
+def test_periodos_do_relatorio():
+    assert sysstock.limites_periodos('mes', datetime(2024, 3, 15), 3) == [
+        (datetime(2024, 1, 1), datetime(2024, 2, 1)),
+        (datetime(2024, 2, 1), datetime(2024, 3, 1)),
+        (datetime(2024, 3, 1), datetime(2024, 4, 1)),
+    ]
+    assert sysstock.limites_periodos('mes', datetime(2024, 12, 31), 1) == [(datetime(2024, 12, 1), datetime(2025, 1, 1))]
+    # Semana de segunda a domingo
+    assert sysstock.limites_periodos('semana', datetime(2024, 3, 13), 1) == [(datetime(2024, 3, 11), datetime(2024, 3, 18))]
+    assert sysstock.limites_periodos('dia', datetime(2024, 3, 1, 15, 30), 2) == [
+        (datetime(2024, 2, 29), datetime(2024, 3, 1)),
+        (datetime(2024, 3, 1), datetime(2024, 3, 2)),
+    ]
+
+
+def test_contagem_de_produto_excluido_nao_volta_para_a_posicao(logado):
+    with sysstock.app.app_context():
+        sysstock.criar_foto_estoque(sysstock.get_db_connection(escrita=True), EMPRESA_ID)
+    sessao = logado.post('/api/contagem/sessoes', json={'zona': ''}).get_json()['sessao']['id']
+    logado.post('/api/contagem/batch', json={'sessao_id': sessao, 'itens': [
+        {'identifier': '01', 'quantidade': 9}, {'identifier': '02', 'quantidade': 7},
+    ]})
+    logado.get('/produto/excluir/2')
+    resposta = logado.post('/api/contagem/finalizar', json={'sessao_id': sessao, 'segundo_plano': False})
+    assert resposta.get_json()['success']
+
+    produto = consultar("SELECT ativo, quantidade FROM produtos WHERE id = 2", single=True)
+    assert produto == {'ativo': 0, 'quantidade': Decimal('100.000')}
+    assert [(m['produto_id'], m['tipo']) for m in movimentacoes()] == [(2, 'EXCLUSAO'), (1, 'CONTAGEM')]
+    assert resumo_gravado() == resumo_recalculado()
+
+    executar("UPDATE estoque_fotos SET data_referencia = data_referencia - INTERVAL 2 HOUR")
+    executar("UPDATE movimentacoes SET data_hora = data_hora - INTERVAL 1 HOUR")
+    with sysstock.app.app_context():
+        posicao = sysstock.posicao_estoque(EMPRESA_ID, sysstock.agora_banco() - timedelta(minutes=30))
+    atual = resumo_recalculado()
+    assert posicao['total_produtos'] == atual['total_produtos'] == 2
+    for campo in ('quantidade_total', 'valor_custo_total', 'valor_venda_total'):
+        assert posicao[campo] == pytest.approx(float(atual[campo]))
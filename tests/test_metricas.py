@@ -0,0 +1,53 @@
+import app as sysstock
+
+
+def test_metrics_exige_token_ou_master(cliente, monkeypatch):
+    monkeypatch.setattr(sysstock, 'METRICS_TOKEN', None)
+    assert cliente.get('/metrics').status_code == 401
+
+    with cliente.session_transaction() as sessao:
+        sessao.update(user_id=1, is_master=True)
+    assert cliente.get('/metrics').status_code == 200
+
+
+def test_metrics_com_token(cliente, monkeypatch):
+    monkeypatch.setattr(sysstock, 'METRICS_TOKEN', 'segredo')
+    assert cliente.get('/metrics', headers={'Authorization': 'Bearer errado'}).status_code == 401
+    resposta = cliente.get('/metrics', headers={'Authorization': 'Bearer segredo'})
+    assert resposta.status_code == 200
+
+
+def test_linhas_por_consulta_somadas_e_expostas(monkeypatch):
+    metricas = sysstock.Metricas()
+    monkeypatch.setattr(sysstock, 'metricas', metricas)
+    sql = sysstock.normalizar_sql('SELECT * FROM produtos WHERE empresa_id = 1')
+    metricas.registrar_consulta(sql, 2.0, False, 3)
+    # Cursor sem buffer: as linhas chegam no fetch
+    metricas.registrar_linhas(sql, 4)
+
+    corpo = sysstock.formatar_prometheus([metricas.snapshot()])
+    assert f'sysstock_sql_rows_total{{sql="{sql}"}} 7' in corpo
+
+
+def test_normalizar_sql_troca_literais_e_colapsa_listas():
+    normalizar = sysstock.normalizar_sql
+    assert normalizar("SELECT *\n  FROM produtos WHERE codigo = 'A;1' AND id = 42") == \
+        "SELECT * FROM produtos WHERE codigo = ? AND id = ?"
+    # Listas de tamanhos diferentes viram o mesmo SQL
+    assert normalizar("SELECT id FROM p WHERE id IN (%s, %s, %s)") == normalizar("SELECT id FROM p WHERE id IN (1,2)") == \
+        "SELECT id FROM p WHERE id IN (?, ...)"
+    assert normalizar("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)") == \
+        "INSERT INTO t (a, b) VALUES (?, ...), ..."
+    assert normalizar("UPDATE t SET q = CASE id WHEN %s THEN %s WHEN %s THEN %s END") == \
+        "UPDATE t SET q = CASE id WHEN ? THEN ? ... END"
+    assert normalizar("SELECT %(emp)s") == "SELECT ?"
+
+
+def test_quantil_histograma():
+    buckets = (10, 100, 1000)
+    assert sysstock.quantil_histograma(0.5, buckets, [0, 0, 0, 0]) == 0.0
+    # Contagens cumulativas: 10 requests, todos entre 10 e 100 ms
+    assert sysstock.quantil_histograma(0.5, buckets, [0, 10, 10, 10]) == 55.0
+    assert sysstock.quantil_histograma(0.5, buckets, [10, 10, 10, 10]) == 5.0
+    # Acima do último limite não há como interpolar: devolve o maior limite
+    assert sysstock.quantil_histograma(0.99, buckets, [0, 0, 0, 10]) == 1000
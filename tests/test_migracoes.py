@@ -0,0 +1,56 @@
+import os
+import re
+import shutil
+
+import app as sysstock
+from conftest import RAIZ, consultar
+
+
+def test_comandos_separados_por_ponto_e_virgula_no_fim_da_linha():
+    texto = """
+-- comentário; com ponto e vírgula
+ALTER TABLE a
+  ADD COLUMN b INT COMMENT 'x;y',
+  ALGORITHM=INSTANT;
+
+CREATE INDEX i ON a (b);
+SELECT 1
+"""
+    assert sysstock.comandos_migracao(texto) == [
+        "ALTER TABLE a\n  ADD COLUMN b INT COMMENT 'x;y',\n  ALGORITHM=INSTANT",
+        "CREATE INDEX i ON a (b)",
+        "SELECT 1",
+    ]
+
+
+def test_setup_master_registra_todas_as_migracoes():
+    with open(os.path.join(RAIZ, 'setup_master.sql'), encoding='utf-8') as f:
+        registradas = re.findall(r"\((\d+), '(\w+)'\)", f.read().split('INSERT INTO `schema_migracoes`')[1])
+    migracoes = [(versao, nome) for versao, nome, _ in sysstock.listar_migracoes()]
+    assert [versao for versao, _ in migracoes] == list(range(1, len(migracoes) + 1))
+    assert [(int(versao), nome) for versao, nome in registradas] == migracoes
+
+
+def test_schema_novo_nao_tem_migracao_pendente(banco):
+    situacoes = {situacao for _, _, situacao in sysstock.aplicar_migracoes(somente_status=True)}
+    assert situacoes == {'aplicada'}
+
+
+def test_migracao_nova_e_aplicada_uma_vez(banco, tmp_path, monkeypatch):
+    diretorio = tmp_path / 'migrations'
+    shutil.copytree(sysstock.MIGRACOES_DIR, diretorio)
+    nova = diretorio / '0999_tabela_teste.sql'
+    nova.write_text("-- teste\nCREATE TABLE tabela_teste (\n  id INT PRIMARY KEY\n);\n"
+                    "INSERT INTO tabela_teste VALUES (1);\n", encoding='utf-8')
+    monkeypatch.setattr(sysstock, 'MIGRACOES_DIR', str(diretorio))
+
+    assert sysstock.aplicar_migracoes(somente_status=True)[-1] == (999, 'tabela_teste', 'pendente')
+    assert sysstock.aplicar_migracoes()[-1] == (999, 'tabela_teste', 'nova')
+    assert sysstock.aplicar_migracoes()[-1] == (999, 'tabela_teste', 'aplicada')
+    assert consultar("SELECT COUNT(*) AS n FROM tabela_teste", single=True)['n'] == 1
+    assert consultar("SELECT checksum FROM schema_migracoes WHERE versao = 999", single=True)['checksum']
+
+    # Arquivo editado depois de aplicado: avisa e não reaplica
+    nova.write_text(nova.read_text(encoding='utf-8') + "INSERT INTO tabela_teste VALUES (2);\n", encoding='utf-8')
+    assert sysstock.aplicar_migracoes()[-1] == (999, 'tabela_teste', 'alterada')
+    assert consultar("SELECT COUNT(*) AS n FROM tabela_teste", single=True)['n'] == 1
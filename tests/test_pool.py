@@ -0,0 +1,22 @@
+import pytest
+from mysql.connector import Error
+
+import app as sysstock
+
+
+def test_falhas_e_esgotamentos_contados(monkeypatch):
+    def recusar(**config):
+        raise Error('recusada')
+    monkeypatch.setattr(sysstock.mysql.connector, 'connect', recusar)
+    monkeypatch.setattr(sysstock.time, 'sleep', lambda segundos: None)
+
+    pool = sysstock.ConnectionPool(1, 0.01)
+    with pytest.raises(Error):
+        pool.acquire()
+    assert pool.snapshot()['falhas_conexao'] == sysstock.DB_CONNECT_ATTEMPTS
+    assert pool.snapshot()['abertas'] == 0
+
+    pool._abertas = 1  # Vaga ocupada por outra thread
+    with pytest.raises(sysstock.PoolEsgotadoError):
+        pool.acquire()
+    assert pool.snapshot()['esgotamentos'] == 1
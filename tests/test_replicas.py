@@ -0,0 +1,60 @@
+import time
+
+import mysql.connector
+import pytest
+
+import app as sysstock
+
+
+@pytest.fixture
+def replica(banco, monkeypatch):
+    """Réplica apontando para o próprio schema de teste: o que importa é para onde a leitura vai"""
+    replica = sysstock.Replica('teste', dict(sysstock.DB_CONFIG))
+    monkeypatch.setattr(sysstock, 'replicas', [replica])
+    return replica
+
+
+def leu_da_replica(resposta):
+    return 'replica;desc="teste"' in resposta.headers['Server-Timing']
+
+
+def test_leitura_logo_apos_escrita_fica_no_primario(logado, replica, monkeypatch):
+    assert leu_da_replica(logado.get('/api/movimentacoes'))
+
+    logado.post('/api/estoque/movimentos', json={'movimentos': [{'produto_id': 1, 'tipo': 'ENTRADA', 'quantidade': 1}]})
+    resposta = logado.get('/api/movimentacoes')
+    assert not leu_da_replica(resposta)
+    assert len(resposta.get_json()['movimentacoes']) == 1
+
+    # Passada a janela, a empresa volta a ler da réplica
+    monkeypatch.setattr(sysstock, 'DB_LEITURA_APOS_ESCRITA', 0)
+    assert leu_da_replica(logado.get('/api/movimentacoes?limite=10'))
+
+
+def test_escrita_recente_e_por_empresa(monkeypatch):
+    assert not sysstock.escrita_recente(7)
+    sysstock.escritas.definir_maximo(sysstock.chave_escrita(7), int(time.time() * 1000))
+    assert sysstock.escrita_recente(7)
+    assert not sysstock.escrita_recente(8)
+    monkeypatch.setattr(sysstock, 'DB_LEITURA_APOS_ESCRITA', 0)
+    assert not sysstock.escrita_recente(7)
+
+
+class CursorFalso:
+    rowcount = 0
+
+    def execute(self, operacao, params=(), **kwargs):
+        pass
+
+
+class ConexaoFalsa:
+    def cursor(self, *args, **kwargs):
+        return CursorFalso()
+
+
+def test_conexao_de_replica_recusa_escrita():
+    cursor = sysstock.ConexaoInstrumentada(ConexaoFalsa(), replica=True).cursor()
+    with pytest.raises(mysql.connector.errors.ProgrammingError):
+        cursor.execute("UPDATE produtos SET quantidade = 0")
+    with sysstock.app.app_context():
+        cursor.execute("SELECT 1")
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import time
+
+import app as sysstock
+from conftest import ADMIN_ID, consultar, entrar
+
+
+def test_editar_usuario_encerra_as_outras_sessoes_dele(logado):
+    outro_aparelho = sysstock.app.test_client()
+    assert entrar(outro_aparelho)['success']
+    assert outro_aparelho.get('/usuarios').status_code == 200
+
+    resposta = logado.post(f'/usuario/editar/{ADMIN_ID}',
+                           data={'nome': 'Carlos Silva', 'usuario': 'Carlos', 'ativo': '1', 'is_admin': '1'})
+    assert resposta.status_code == 302
+
+    # Quem editou a si mesmo segue logado; o outro aparelho cai no login
+    assert logado.get('/usuarios').status_code == 200
+    revogado = outro_aparelho.get('/usuarios')
+    assert revogado.status_code == 302 and '/login' in revogado.headers['Location']
+
+
+def test_revogar_empresa_encerra_sessoes_dos_usuarios(logado):
+    sysstock.revogar_empresa(1)
+    assert logado.get('/usuarios').status_code == 302
+
+
+def test_login_troca_o_id_da_sessao(banco, cliente):
+    # O redirect para o login grava a mensagem flash: já existe uma sessão anônima
+    cliente.get('/usuarios')
+    anonima = cliente.get_cookie('session').value
+    assert sysstock.app.session_interface.armazem.carregar(anonima) is not None
+
+    assert entrar(cliente)['success']
+    assert cliente.get_cookie('session').value != anonima
+    assert sysstock.app.session_interface.armazem.carregar(anonima) is None
+
+
+def test_login_migra_hash_legado_para_scrypt(banco, cliente):
+    assert len(consultar("SELECT senha FROM usuarios WHERE id = %s", (ADMIN_ID,), single=True)['senha']) == 64
+
+    assert entrar(cliente)['success']
+    senha = consultar("SELECT senha FROM usuarios WHERE id = %s", (ADMIN_ID,), single=True)['senha']
+    assert senha.startswith('scrypt$')
+
+    assert entrar(sysstock.app.test_client())['success']
+    assert not entrar(sysstock.app.test_client(), senha='errada')['success']
+    assert consultar("SELECT senha FROM usuarios WHERE id = %s", (ADMIN_ID,), single=True)['senha'] == senha
+
+
+def test_conferir_hash_scrypt_e_legado():
+    novo = sysstock._gerar_hash('segredo')
+    assert sysstock._conferir('segredo', novo) == (True, False)
+    assert sysstock._conferir('outro', novo)[0] is False
+
+    legado = hashlib.sha256(b'segredo').hexdigest()
+    assert sysstock._conferir('segredo', legado) == (True, True)
+    assert sysstock._conferir('outro', legado)[0] is False
+
+
+def test_empresa_inativa_ou_inexistente_tambem_paga_o_hash(cliente, monkeypatch):
+    geracao = sysstock.geracoes.ler(sysstock.CHAVE_EMPRESAS)
+    sysstock.cache_empresas.guardar('tag', 'inativa', {'id': 9, 'descricao': 'Inativa', 'ativo': 'N'}, geracao)
+    sysstock.cache_empresas.guardar('tag', 'sumida', sysstock.CacheIdentificadores.NAO_ENCONTRADO, geracao)
+    hashes = []
+    executar_hash = sysstock.executar_hash
+    monkeypatch.setattr(sysstock, 'executar_hash', lambda func, *args: hashes.append(func) or executar_hash(func, *args))
+
+    for empresa in ('inativa', 'sumida'):
+        resposta = cliente.post('/login', data={'empresa': empresa, 'usuario': 'x', 'senha': 'y'}).get_json()
+        assert not resposta['success']
+    assert hashes == [sysstock._conferir, sysstock._conferir]
+
+
+# ==================== ARMAZÉM ====================
+
+SID = 'a' * 43
+
+
+def test_armazem_grava_sem_deixar_temporario(tmp_path):
+    armazem = sysstock.ArmazemSessoes(str(tmp_path), 60)
+    armazem.salvar(SID, {'user_id': 1})
+    armazem.salvar(SID, {'user_id': 2})
+    assert os.listdir(tmp_path) == [f'{SID}.json']
+    assert sysstock.ArmazemSessoes(str(tmp_path), 60).carregar(SID) == {'user_id': 2}
+
+
+def test_armazem_limpa_expiradas_e_temporarios_orfaos(tmp_path):
+    armazem = sysstock.ArmazemSessoes(str(tmp_path), 60)
+    armazem.salvar(SID, {'user_id': 1})
+    armazem.salvar('b' * 43, {'user_id': 2})
+    orfao = tmp_path / f'{SID}.abc.tmp'
+    orfao.write_text('{')
+    velho = time.time() - 120
+    os.utime(tmp_path / f'{SID}.json', (velho, velho))
+    os.utime(orfao, (velho, velho))
+
+    assert armazem.limpar_expiradas() == 2
+    assert os.listdir(tmp_path) == [f'{"b" * 43}.json']
+    assert armazem.carregar(SID) is None